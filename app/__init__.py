@@ -1,7 +1,44 @@
-#This script is used to view the existing users in the database and add a default user if none exist.
-from .auth import auth_bp
-from .api import api_bp
-from .dashboard import dashboard_bp
+from flask import Flask
+from flask_cors import CORS
+from flask_login import LoginManager
+import os
 
-# List of all blueprints for easier registration
-blueprints = [auth_bp, api_bp, dashboard_bp]
+login_manager = LoginManager()
+
+def create_app():
+    """
+    Build the Flask app. Only the web views are imported here; GPIO,
+    DHT and motion drivers load on first use through app.hardware, so
+    processes that only serve pages never touch the hardware libraries.
+    """
+    # Imported here so `import app.<module>` from scripts stays light
+    from app import hardware, http_cache, metrics
+    from app.models import setup_database, load_user
+    from app.routes import blueprints  # Import blueprints list
+
+    app = Flask(__name__, template_folder="../templates", static_folder="../public/static")
+    CORS(app)
+    app.secret_key = os.environ.get("SECRET_KEY", "default_secret_key_for_local_dev")
+    app.config["DB_FILE"] = os.environ.get("DB_FILE", "smartnest.db")
+    app.config["DATA_DIR"] = os.environ.get("DATA_DIR", "data")
+    app.config["HARDWARE"] = hardware.backend()  # Real vs mock is decided once, here
+
+    # Initialize extensions
+    login_manager.init_app(app)
+    login_manager.login_view = "auth.login"
+    login_manager.user_loader(load_user)
+
+    # Setup database
+    setup_database()
+
+    # Register blueprints dynamically
+    for blueprint in blueprints:
+        app.register_blueprint(blueprint)
+
+    # gzip/brotli for JSON and HTML responses
+    http_cache.init_app(app)
+
+    # Per-route timing and the Prometheus /metrics endpoint
+    metrics.init_app(app)
+
+    return app
@@ -1,23 +1,63 @@
-from flask import Blueprint, jsonify
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, date
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from flask_login import login_required
-from app.sensors import read_sensor  # Corrected function name
+from app.sampler import sensor_sampler, StaleReadingError
 from app.led import control_led
 from app.mqtt_client import mqtt_client
+from app.live import live_broadcaster, led_follower
+from app.models import BUCKET_SIZES, iter_sensor_history, iter_sensor_buckets, sensor_data_version, oldest_sensor_timestamp
+from app.usage_index import daily_usage
+from app.decimate import METHODS
+from app.http_cache import cached
+from app.devices import fetch_devices, fetch_device, iter_device_history
+from app.archive import COLUMNS as EXPORT_COLUMNS, FORMATS as EXPORT_FORMATS, export_chunks, parse_time
 
 api_bp = Blueprint("api", __name__)
 
+HISTORY_DEFAULT_LIMIT = int(os.environ.get("HISTORY_DEFAULT_LIMIT", 1000))
+HISTORY_MAX_LIMIT = int(os.environ.get("HISTORY_MAX_LIMIT", 10000))
+PLOT_DEFAULT_POINTS = int(os.environ.get("PLOT_DEFAULT_POINTS", 800))  # Roughly one point per pixel of chart width
+PLOT_MAX_POINTS = int(os.environ.get("PLOT_MAX_POINTS", 5000))
+PLOT_RAW_MAX_SPAN = int(os.environ.get("PLOT_RAW_MAX_SPAN", 7 * 86400))  # Longer ranges are drawn from hourly rollups
+PLOT_HOURLY_MAX_SPAN = int(os.environ.get("PLOT_HOURLY_MAX_SPAN", 366 * 86400))  # ...and daily rollups beyond this
+PLOT_MAX_SOURCE_ROWS = int(os.environ.get("PLOT_MAX_SOURCE_ROWS", 200000))  # Rows read before decimation
+PLOT_SERIES = ("usage", "temperature", "humidity")
+
 @api_bp.route("/api/sensor")
 @login_required
 def get_sensor_data_api():
     """
-    Fetch sensor data from the DHT sensor and return as JSON.
+    Return the latest sensor reading from the background sampler as JSON.
+    Never touches the DHT sensor itself; readings older than
+    SENSOR_MAX_STALENESS seconds are refused with a 503.
     """
     try:
-        data = read_sensor()  # Use the correct function from sensors.py
+        data = sensor_sampler.latest()
         return jsonify(data)
+    except StaleReadingError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@api_bp.route("/api/stream")
+@login_required
+def stream_live_data():
+    """
+    Push new sensor readings and LED changes to the dashboard as
+    Server-Sent Events ("reading" and "led" events).
+    """
+    sensor_sampler.start()
+    led_follower.start()  # LED changes made by other workers or the automation service
+    subscriber = live_broadcaster.subscribe()
+    response = Response(stream_with_context(live_broadcaster.stream(subscriber)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Don't let a reverse proxy buffer the stream
+    return response
+
 @api_bp.route("/api/led/<state>")
 @login_required
 def control_led_api(state):
@@ -27,20 +67,263 @@ def control_led_api(state):
     try:
         # Validate and control LED
         led_response = control_led(state)
-        # Publish the LED state to MQTT
-        mqtt_client.publish("smartnest/led", state.upper())
+        # Queue the LED state for MQTT; the background client sends it.
+        # /api/stream subscribers get the change from the LED listener.
+        mqtt_client.publish_async("smartnest/led", state.upper())
         return jsonify(led_response)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+def _history_params(args):
+    """Validate the /api/sensor-data query string."""
+    start = parse_time(args.get("from"), 0)
+    end = parse_time(args.get("to"), int(time.time()) + 1)
+    if end <= start:
+        raise ValueError("'to' must be after 'from'")
+
+    try:
+        limit = int(args.get("limit", HISTORY_DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("'limit' must be an integer")
+    if not 1 <= limit <= HISTORY_MAX_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {HISTORY_MAX_LIMIT}")
+
+    bucket = args.get("bucket")
+    if bucket is not None and bucket not in BUCKET_SIZES:
+        raise ValueError(f"'bucket' must be one of {', '.join(BUCKET_SIZES)}")
+
+    cursor = args.get("cursor")
+    if cursor:
+        try:
+            if bucket:
+                cursor = int(cursor)
+            else:
+                cursor_ts, cursor_id = cursor.split(":")
+                cursor = (int(cursor_ts), int(cursor_id))
+        except ValueError:
+            raise ValueError("Invalid 'cursor'")
+    else:
+        cursor = None
+    return start, end, limit, bucket, cursor
+
+def _stream_history(rows, limit, bucket):
+    """Stream rows as a JSON object, one row per chunk, ending with the next page cursor."""
+    yield '{"data":['
+    count = 0
+    last = None
+    for row in rows:
+        if bucket:
+            item = {
+                "timestamp": row[0],
+                "count": row[1],
+                "temperature": {"min": row[2], "max": row[3], "avg": row[4]},
+                "humidity": {"min": row[5], "max": row[6], "avg": row[7]},
+            }
+        else:
+            item = {"id": row[0], "timestamp": row[1], "temperature": row[2], "humidity": row[3]}
+        yield ("," if count else "") + json.dumps(item)
+        count += 1
+        last = row
+
+    next_cursor = None
+    if count == limit:
+        next_cursor = str(last[0]) if bucket else f"{last[1]}:{last[0]}"
+    yield "]," + json.dumps({"next_cursor": next_cursor})[1:]
+
 @api_bp.route("/api/sensor-data", methods=["GET"])
 @login_required
+@cached("sensor")
 def get_all_sensor_data():
-    """Fetch all sensor data from the database."""
+    """
+    Stream stored sensor data as JSON.
+    Query parameters: from/to (epoch seconds or ISO), limit, cursor
+    (the previous page's next_cursor) and bucket (1m, 1h or 1d) to return
+    min/max/avg aggregates instead of raw readings.
+    """
     try:
-        data = fetch_all_sensor_data()
-        return jsonify(data)
+        start, end, limit, bucket, cursor = _history_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if bucket:
+            rows = iter_sensor_buckets(start, end, bucket, limit, after=cursor)
+        else:
+            rows = iter_sensor_history(start, end, limit, after=cursor)
+        return Response(stream_with_context(_stream_history(rows, limit, bucket)), mimetype="application/json")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/api/export/<dataset>")
+@login_required
+def export_data(dataset):
+    """
+    Download sensor readings ("sensor") or daily usage records ("usage")
+    as CSV or NDJSON. Query parameters: from/to, format (csv or ndjson) and
+    compress (gzip, the default, or none). Rows are read a page at a time
+    and compressed as they are sent, so memory use does not grow with the
+    range.
+    """
+    if dataset not in EXPORT_COLUMNS:
+        return jsonify({"error": f"Unknown dataset '{dataset}'"}), 404
+    fmt = request.args.get("format", "csv")
+    compress = request.args.get("compress", "gzip")
+    try:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"'format' must be one of {', '.join(EXPORT_FORMATS)}")
+        if compress not in ("gzip", "none"):
+            raise ValueError("'compress' must be gzip or none")
+        start = parse_time(request.args.get("from"), 0)
+        end = parse_time(request.args.get("to"), int(time.time()) + 1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filename = f"{dataset}-{start}-{end}.{fmt}"
+    chunks = export_chunks(dataset, start, end, fmt, compress == "gzip")
+    if compress == "gzip":
+        filename += ".gz"
+        mimetype = "application/gzip"
+    else:
+        mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+def _device_json(row):
+    device, last_seen, temperature, humidity, readings = row
+    return {"device": device, "timestamp": last_seen, "temperature": temperature,
+            "humidity": humidity, "readings": readings}
+
+@api_bp.route("/api/devices")
+@login_required
+@cached("sensor")
+def list_devices():
+    """Return every node that has reported, with its latest reading."""
+    try:
+        return jsonify({"devices": [_device_json(row) for row in fetch_devices()]})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/api/devices/<device>/latest")
+@login_required
+@cached("sensor")
+def get_device_latest(device):
+    """Return the latest reading received from one node."""
+    try:
+        row = fetch_device(device)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if row is None:
+        return jsonify({"error": f"Unknown device '{device}'"}), 404
+    return jsonify(_device_json(row))
+
+@api_bp.route("/api/devices/<device>/history")
+@login_required
+@cached("sensor")
+def get_device_history(device):
+    """
+    Stream one node's readings as JSON, oldest first. Takes the same
+    from/to/limit/cursor parameters as /api/sensor-data (no bucket).
+    """
+    try:
+        start, end, limit, bucket, cursor = _history_params(request.args)
+        if bucket:
+            raise ValueError("'bucket' is not supported for device history")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        rows = iter_device_history(device, start, end, limit, after=cursor)
+        return Response(stream_with_context(_stream_history(rows, limit, None)), mimetype="application/json")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _plot_params(args):
+    """Validate the /api/plot-data query string."""
+    series = args.get("series", "usage")
+    if series not in PLOT_SERIES:
+        raise ValueError(f"'series' must be one of {', '.join(PLOT_SERIES)}")
+    method = args.get("method", "lttb")
+    if method not in METHODS:
+        raise ValueError(f"'method' must be one of {', '.join(METHODS)}")
+    try:
+        points = int(args.get("points", PLOT_DEFAULT_POINTS))
+    except ValueError:
+        raise ValueError("'points' must be an integer")
+    if not 3 <= points <= PLOT_MAX_POINTS:
+        raise ValueError(f"'points' must be between 3 and {PLOT_MAX_POINTS}")
+    start = parse_time(args.get("from"), 0)
+    end = parse_time(args.get("to"), int(time.time()) + 1)
+    if end <= start:
+        raise ValueError("'to' must be after 'from'")
+    return series, method, points, start, end
+
+def _plot_source(start, end):
+    """Pick raw readings or a rollup so decimation never starts from millions of rows."""
+    span = end - max(start, oldest_sensor_timestamp() or end)
+    if span <= PLOT_RAW_MAX_SPAN:
+        return "raw"
+    return "1h" if span <= PLOT_HOURLY_MAX_SPAN else "1d"
+
+def _plot_series(series, source, start, end):
+    """Return (labels, xs, ys) for a series; xs are numeric for decimation, labels are what the chart shows."""
+    if series == "usage":
+        days = sorted(daily_usage().items())
+        days = [(day, usage) for day, usage in days
+                if start <= datetime.strptime(day, "%Y-%m-%d").timestamp() < end]
+        labels = [day for day, _ in days]
+        xs = [date.fromisoformat(day).toordinal() for day in labels]
+        return labels, xs, [usage for _, usage in days]
+
+    if source == "raw":
+        column = 2 if series == "temperature" else 3
+        rows = [(row[1], row[column]) for row in iter_sensor_history(start, end, PLOT_MAX_SOURCE_ROWS)]
+    else:
+        column = 4 if series == "temperature" else 7  # Bucket averages
+        rows = [(row[0], row[column]) for row in iter_sensor_buckets(start, end, source, PLOT_MAX_SOURCE_ROWS)]
+    xs = [x for x, _ in rows]
+    return xs, xs, [y for _, y in rows]
+
+@api_bp.route("/api/plot-data")
+@login_required
+def get_plot_data():
+    """
+    Return a chart series decimated on the server to at most `points`
+    points. Query parameters: series (usage, temperature or humidity),
+    points, method (lttb or minmax) and from/to. Responses carry an ETag
+    derived from the data in range, so an unchanged chart costs a 304.
+    """
+    try:
+        series, method, points, start, end = _plot_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if series == "usage":
+            source = "daily"
+            version = sorted(daily_usage().items())
+        else:
+            source = _plot_source(start, end)
+            version = sensor_data_version(start, end, None if source == "raw" else source)
+        # `to` defaults to now; the fingerprint, not the clock, decides whether the data changed
+        key = [series, method, points, start, request.args.get("to"), source, version]
+        etag = hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            labels, xs, ys = _plot_series(series, source, start, end)
+            indices = METHODS[method](xs, ys, points)
+            response = jsonify({
+                "series": series,
+                "source": source,
+                "method": method,
+                "total_points": len(xs),
+                "points": [[labels[i], ys[i]] for i in indices],
+            })
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"  # Always revalidate; 304s are cheap
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
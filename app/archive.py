@@ -0,0 +1,326 @@
+import os
+import io
+import csv
+import gzip
+import json
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from app.models import iter_sensor_history, save_sensor_data_batch
+from app.storage import get_connection
+from app.usage_store import SUFFIX as USAGE_SUFFIX, iter_records, read_columns, write_day_file
+
+DATA_DIR = os.environ.get("DATA_DIR", "data")
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", 5000))  # Rows per keyset query; no read stays open between pages
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 65536))  # Characters of CSV/NDJSON per streamed chunk
+EXPORT_GZIP_LEVEL = int(os.environ.get("EXPORT_GZIP_LEVEL", 6))
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 5000))  # Rows per import transaction
+
+MAX_TIMESTAMP = 253402300799  # 9999-12-31T23:59:59Z; larger values overflow SQLite and datetime
+
+FORMATS = ("csv", "ndjson")
+COLUMNS = {
+    "sensor": ("timestamp", "temperature", "humidity"),  # sensor_data
+    "usage": ("timestamp", "usage"),  # Daily usage files in DATA_DIR
+}
+
+def parse_time(value, default):
+    """Parse a time given as epoch seconds or an ISO date/time."""
+    if value is None or value == "":
+        return default
+    try:
+        timestamp = int(float(value))
+    except (ValueError, OverflowError):  # OverflowError: "inf"
+        try:
+            return int(datetime.fromisoformat(value).timestamp())
+        except (ValueError, OverflowError):
+            raise ValueError(f"Invalid time '{value}', expected epoch seconds or ISO format")
+    if abs(timestamp) > MAX_TIMESTAMP:
+        raise ValueError(f"Time '{value}' is out of range")
+    return timestamp
+
+def format_from_path(path):
+    """Return "csv" or "ndjson" from a name like sensor.csv.gz, or None."""
+    name = path[:-len(".gz")] if path.endswith(".gz") else path
+    for fmt in FORMATS:
+        if name.endswith("." + fmt):
+            return fmt
+    return None
+
+# Export
+
+def iter_sensor_rows(start, end, page_size=EXPORT_PAGE_SIZE):
+    """
+    Yield (timestamp, temperature, humidity) with start <= timestamp < end,
+    oldest first. Rows are read one keyset page at a time, so an export of
+    any size holds one page in memory and never keeps a long read open
+    against the collector's writes.
+    """
+    after = None
+    while True:
+        count = 0
+        for row_id, timestamp, temperature, humidity in iter_sensor_history(start, end, page_size, after=after):
+            yield timestamp, temperature, humidity
+            after = (timestamp, row_id)
+            count += 1
+        if count < page_size:
+            return
+
+def _day_files(data_dir):
+    """Return {"YYYY-MM-DD": path}, preferring the columnar file when a day has both unless the JSON is newer."""
+    days = {}
+    if not os.path.isdir(data_dir):
+        return days
+    for filename in os.listdir(data_dir):
+        day, ext = os.path.splitext(filename)
+        if ext not in (".json", USAGE_SUFFIX):
+            continue
+        try:
+            datetime.strptime(day, "%Y-%m-%d")
+        except ValueError:
+            continue  # Not a daily usage file
+        path = os.path.join(data_dir, filename)
+        if day in days:
+            usage_path, json_path = (path, days[day]) if ext == USAGE_SUFFIX else (days[day], path)
+            path = usage_path if os.path.getmtime(usage_path) >= os.path.getmtime(json_path) else json_path
+        days[day] = path
+    return days
+
+def _read_day(path):
+    """Return one day file's (epoch seconds, usage) records, oldest first."""
+    if path.endswith(USAGE_SUFFIX):
+        return sorted(iter_records(path))
+    with open(path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError(f"{path} does not contain a list of readings")
+    return sorted((int(datetime.fromisoformat(item["timestamp"]).timestamp()), item.get("usage", 0)) for item in data)
+
+def iter_usage_rows(start, end, data_dir=None):
+    """Yield (timestamp, usage) from the daily usage files with start <= timestamp < end, one day file at a time."""
+    data_dir = data_dir or DATA_DIR
+    for day, path in sorted(_day_files(data_dir).items()):
+        day_start = datetime.strptime(day, "%Y-%m-%d")
+        if day_start.timestamp() >= end or (day_start + timedelta(days=1)).timestamp() <= start:
+            continue
+        try:
+            records = _read_day(path)
+        except (OSError, ValueError, KeyError, json.JSONDecodeError) as e:
+            print(f"Error processing file {os.path.basename(path)}: {e}")
+            continue
+        for timestamp, usage in records:
+            if start <= timestamp < end:
+                yield timestamp, usage
+
+def iter_rows(dataset, start, end, data_dir=None):
+    if dataset == "sensor":
+        return iter_sensor_rows(start, end)
+    if dataset == "usage":
+        return iter_usage_rows(start, end, data_dir)
+    raise ValueError(f"Unknown dataset '{dataset}', expected one of {', '.join(COLUMNS)}")
+
+def encode_rows(rows, columns, fmt="csv", chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield rows as CSV (with a header line) or NDJSON text, in chunks of about `chunk_size` characters."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        write = writer.writerow
+    else:
+        write = lambda row: buffer.write(json.dumps(dict(zip(columns, row))) + "\n")
+
+    for row in rows:
+        write(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def gzip_chunks(chunks, level=EXPORT_GZIP_LEVEL):
+    """Gzip a stream of text chunks as they arrive, in constant memory."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_chunks(dataset, start, end, fmt="csv", compress=True, data_dir=None):
+    """Yield an export of `dataset` in [start, end) as gzip bytes, or as text when `compress` is False."""
+    chunks = encode_rows(iter_rows(dataset, start, end, data_dir), COLUMNS[dataset], fmt)
+    return gzip_chunks(chunks) if compress else chunks
+
+def export_to_file(dataset, path, start=0, end=None, fmt=None, data_dir=None):
+    """
+    Write `dataset` in [start, end) to `path` ("-" for stdout). The format
+    comes from the name (.csv, .ndjson) unless given, and names ending in
+    .gz are gzip-compressed. Returns a report of rows, bytes and seconds.
+    """
+    started = time.perf_counter()
+    end = end if end is not None else int(time.time()) + 1
+    fmt = fmt or format_from_path(path) or "csv"
+    counted = [0]
+
+    def counting(rows):
+        for row in rows:
+            counted[0] += 1
+            yield row
+
+    chunks = encode_rows(counting(iter_rows(dataset, start, end, data_dir)), COLUMNS[dataset], fmt)
+    if path.endswith(".gz"):
+        chunks = gzip_chunks(chunks)
+    else:
+        chunks = (chunk.encode() for chunk in chunks)
+
+    written = 0
+    out = open(path, "wb") if path != "-" else os.fdopen(os.dup(1), "wb")
+    with out:
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+    return {"dataset": dataset, "format": fmt, "rows": counted[0], "bytes": written,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+# Import
+
+def iter_archive(path, fmt=None):
+    """Yield rows as dicts from a CSV or NDJSON file, gzip-compressed or not, one line at a time."""
+    fmt = fmt or format_from_path(path) or "csv"
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"  # Gzip magic, whatever the file is called
+    opener = gzip.open if compressed else open
+    with opener(path, "rt", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def _existing_timestamps(batch):
+    """Timestamps of `batch` that sensor_data already holds, so re-importing an archive adds nothing."""
+    low = min(row[0] for row in batch)
+    high = max(row[0] for row in batch)
+    cursor = get_connection().execute(
+        "SELECT timestamp FROM sensor_data WHERE timestamp >= ? AND timestamp <= ?", (low, high)
+    )
+    return {row[0] for row in cursor}
+
+def import_sensor_rows(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Insert {"timestamp", "temperature", "humidity"} rows into sensor_data,
+    `batch_size` rows per transaction. Rollups are updated with each batch.
+    Rows whose timestamp is already stored are skipped.
+    """
+    report = {"rows_read": 0, "rows_imported": 0, "rows_skipped": 0, "batches": 0}
+
+    def flush(batch):
+        existing = _existing_timestamps(batch)
+        new = [row for row in batch if row[0] not in existing]
+        report["rows_skipped"] += len(batch) - len(new)
+        if new:
+            save_sensor_data_batch(new)
+            report["rows_imported"] += len(new)
+            report["batches"] += 1
+
+    batch = []
+    for row in rows:
+        report["rows_read"] += 1
+        batch.append((int(float(row["timestamp"])), float(row["temperature"]), float(row["humidity"])))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return report
+
+def import_usage_rows(rows, data_dir=None, replace=False):
+    """
+    Write {"timestamp", "usage"} rows to columnar day files in `data_dir`,
+    holding one day in memory at a time. Days that already have a file are
+    skipped unless `replace` is set.
+    """
+    data_dir = data_dir or DATA_DIR
+    os.makedirs(data_dir, exist_ok=True)
+    report = {"rows_read": 0, "rows_imported": 0, "rows_skipped": 0, "days_written": 0, "days_skipped": 0}
+    written = set()  # Days written by this import; rows for them that arrive later are merged in
+    existing = _day_files(data_dir)
+
+    def flush(day, records):
+        path = os.path.join(data_dir, day + USAGE_SUFFIX)
+        if day in written:
+            timestamps, usages = read_columns(path)
+            merged = sorted(list(zip(timestamps, usages)) + records)
+        elif day in existing and not replace:
+            report["days_skipped"] += 1
+            report["rows_skipped"] += len(records)
+            return
+        else:
+            merged = sorted(records)
+            report["days_written"] += 1
+        write_day_file(path, [ts for ts, _ in merged], [usage for _, usage in merged])
+        written.add(day)
+        report["rows_imported"] += len(records)
+
+    day, records = None, []
+    for row in rows:
+        report["rows_read"] += 1
+        timestamp = int(float(row["timestamp"]))
+        row_day = date.fromtimestamp(timestamp).isoformat()
+        if row_day != day:
+            if records:
+                flush(day, records)
+            day, records = row_day, []
+        records.append((timestamp, float(row["usage"])))
+    if records:
+        flush(day, records)
+    return report
+
+def import_file(dataset, path, fmt=None, data_dir=None, replace=False, batch_size=IMPORT_BATCH_SIZE):
+    """Load an archive written by export_to_file() back into `dataset`. Returns a report."""
+    started = time.perf_counter()
+    rows = iter_archive(path, fmt)
+    if dataset == "sensor":
+        report = import_sensor_rows(rows, batch_size)
+    elif dataset == "usage":
+        report = import_usage_rows(rows, data_dir, replace)
+    else:
+        raise ValueError(f"Unknown dataset '{dataset}', expected one of {', '.join(COLUMNS)}")
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+if __name__ == "__main__":
+    # python -m app.archive export sensor sensor.csv.gz --from 2024-01-01 --to 2024-02-01
+    # python -m app.archive import sensor sensor.csv.gz
+    import argparse
+    import sys
+    from app.models import setup_database
+
+    parser = argparse.ArgumentParser(prog="python -m app.archive",
+                                     description="Stream sensor history and daily usage to and from CSV/NDJSON.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("dataset", choices=tuple(COLUMNS))
+    parser.add_argument("path", help="File to write or read; .gz is gzip-compressed, '-' exports to stdout")
+    parser.add_argument("--from", dest="start", help="Export rows at or after this time (epoch seconds or ISO)")
+    parser.add_argument("--to", dest="end", help="Export rows before this time (epoch seconds or ISO)")
+    parser.add_argument("--format", choices=FORMATS, help="Default: from the file name, else csv")
+    parser.add_argument("--data-dir", help="Daily usage files (default: DATA_DIR)")
+    parser.add_argument("--replace", action="store_true", help="Import: overwrite usage days that already have a file")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Import: rows per transaction")
+    args = parser.parse_args()
+
+    setup_database()
+    try:
+        if args.command == "export":
+            report = export_to_file(args.dataset, args.path, parse_time(args.start, 0),
+                                    parse_time(args.end, int(time.time()) + 1), args.format, args.data_dir)
+        else:
+            report = import_file(args.dataset, args.path, args.format, args.data_dir, args.replace, args.batch_size)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(report), file=sys.stderr if args.path == "-" else sys.stdout)
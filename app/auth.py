@@ -1,15 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required
 from werkzeug.security import generate_password_hash
-from app.models import load_user
-from app.utils import validate_password
+from app.models import load_user, add_user
+from app.storage import query_one
+from app.auth_throttle import password_verifier, login_limiter, AuthBusyError
 import sqlite3
-import os
 
 auth_bp = Blueprint("auth", __name__)
 
-DB_FILE = os.environ.get("DB_FILE", "smartnest.db")
-
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
@@ -17,17 +15,23 @@ def login():
         username = request.form.get("username")
         password = request.form.get("password")
 
-        # Connect to the database and fetch user info
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, username, password FROM users WHERE username = ?", (username,))
-        user = cursor.fetchone()
-        conn.close()
+        # Throttle per username and per client IP before doing any hashing
+        if not (login_limiter.allow(f"user:{username}") and login_limiter.allow(f"ip:{request.remote_addr}")):
+            flash("Too many login attempts. Please wait and try again.", "danger")
+            return render_template("login.html"), 429
+
+        # Fetch user info over the pooled connection
+        user = query_one("SELECT id, username, password FROM users WHERE username = ?", (username,))
 
-        # Validate credentials
+        # Validate credentials on the bounded hashing pool
         if user:
             user_id, db_username, hashed_password = user
-            if validate_password(hashed_password, password):
+            try:
+                valid = password_verifier.verify(hashed_password, password)
+            except AuthBusyError:
+                flash("The server is busy. Please try again in a moment.", "danger")
+                return render_template("login.html"), 503
+            if valid:
                 user_obj = load_user(user_id)
                 login_user(user_obj)
                 return redirect(url_for("dashboard.dashboard"))  # Redirect to the dashboard
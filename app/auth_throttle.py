@@ -0,0 +1,82 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import check_password_hash
+
+AUTH_WORKERS = int(os.environ.get("AUTH_WORKERS", 2))  # Password hashes verified in parallel
+AUTH_MAX_PENDING = int(os.environ.get("AUTH_MAX_PENDING", 8))  # Verifications running or queued before logins are refused
+AUTH_TIMEOUT = float(os.environ.get("AUTH_TIMEOUT", 10.0))  # Seconds a login waits for its verification
+LOGIN_RATE = float(os.environ.get("LOGIN_RATE", 0.2))  # Attempts refilled per second per username/IP
+LOGIN_BURST = int(os.environ.get("LOGIN_BURST", 5))  # Attempts allowed back to back
+LIMITER_MAX_KEYS = int(os.environ.get("LOGIN_LIMITER_MAX_KEYS", 10000))  # Buckets kept before the oldest are forgotten
+
+class AuthBusyError(RuntimeError):
+    """Raised when too many password verifications are already pending."""
+
+class PasswordVerifier:
+    """
+    Runs pbkdf2 password checks on a small worker pool. At most
+    `max_pending` checks may be running or queued; beyond that new logins
+    fail fast instead of piling up CPU work next to the sensor and LED API.
+    """
+
+    def __init__(self, workers=AUTH_WORKERS, max_pending=AUTH_MAX_PENDING, timeout=AUTH_TIMEOUT):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.verifications = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def verify(self, stored_password, provided_password):
+        """
+        Check a password on the pool. Raises AuthBusyError when the pool is
+        saturated or the check takes longer than `timeout` seconds.
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise AuthBusyError("Too many logins in progress")
+        try:
+            future = self._executor.submit(check_password_hash, stored_password, provided_password)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self.verifications += 1
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            raise AuthBusyError("Password check timed out")
+
+class TokenBucketLimiter:
+    """Per-key token buckets: `burst` attempts at once, refilled at `rate` per second."""
+
+    def __init__(self, rate=LOGIN_RATE, burst=LOGIN_BURST, max_keys=LIMITER_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def allow(self, key):
+        """Take a token for `key`. Returns False if its bucket is empty."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+password_verifier = PasswordVerifier()
+login_limiter = TokenBucketLimiter()
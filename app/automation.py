@@ -0,0 +1,240 @@
+import os
+import json
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+AUTOMATION_RULES = os.environ.get("AUTOMATION_RULES", "automation.json")
+EVENT_QUEUE_SIZE = int(os.environ.get("AUTOMATION_EVENT_QUEUE", 1000))
+
+# Used when no rules file exists
+DEFAULT_RULES = [
+    {"name": "motion-light", "trigger": "motion", "action": "led_on", "duration": 30, "debounce": 0.5},
+    {"name": "high-temperature-alert", "trigger": "temperature", "above": 28,
+     "action": "publish", "topic": "smartnest/alert", "debounce": 300},
+]
+
+class Rule:
+    """
+    One automation rule.
+
+    `trigger` is an event name ("motion", "no_motion") or a reading metric
+    ("temperature", "humidity") compared with `above`/`below`. Metric rules
+    fire when the reading crosses into the condition, not on every reading
+    while it holds. `debounce` is the minimum number of seconds between two
+    firings. Actions are "led_on" (optionally for `duration` seconds),
+    "led_off" and "publish" (to `topic`, with `payload` or the reading).
+    """
+
+    EVENTS = ("motion", "no_motion")
+    METRICS = ("temperature", "humidity")
+    ACTIONS = ("led_on", "led_off", "publish")
+
+    def __init__(self, name, trigger, action, above=None, below=None, duration=None,
+                 debounce=0.0, topic=None, payload=None):
+        if trigger not in self.EVENTS + self.METRICS:
+            raise ValueError(f"Rule {name}: unknown trigger '{trigger}'")
+        if action not in self.ACTIONS:
+            raise ValueError(f"Rule {name}: unknown action '{action}'")
+        if trigger in self.METRICS and above is None and below is None:
+            raise ValueError(f"Rule {name}: '{trigger}' rules need 'above' or 'below'")
+        if action == "publish" and not topic:
+            raise ValueError(f"Rule {name}: 'publish' rules need a 'topic'")
+        self.name = name
+        self.trigger = trigger
+        self.action = action
+        self.above = above
+        self.below = below
+        self.duration = duration
+        self.debounce = debounce
+        self.topic = topic
+        self.payload = payload
+        self.fired = 0
+        self._last_fired = float("-inf")
+        self._condition_held = False
+
+    @classmethod
+    def from_dict(cls, config):
+        return cls(**config)
+
+    def matches(self, event, data):
+        if self.trigger in self.EVENTS:
+            return event == self.trigger
+        if event != "reading" or data is None or data.get(self.trigger) is None:
+            return False
+
+        value = data[self.trigger]
+        held = (self.above is None or value > self.above) and (self.below is None or value < self.below)
+        crossed = held and not self._condition_held
+        self._condition_held = held
+        return crossed
+
+    def debounced(self, now):
+        """Record a firing at `now` unless the rule fired less than `debounce` seconds ago."""
+        if now - self._last_fired < self.debounce:
+            return True
+        self._last_fired = now
+        self.fired += 1
+        return False
+
+def load_rules(path=AUTOMATION_RULES):
+    """Load rules from a JSON list in `path`, falling back to DEFAULT_RULES."""
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            configs = json.load(f)
+    else:
+        configs = DEFAULT_RULES
+    return [Rule.from_dict(config) for config in configs]
+
+class AutomationEngine:
+    """
+    Evaluates rules on a single scheduler thread.
+
+    Hardware callbacks and sensor listeners only post() events onto a
+    queue, so they return immediately. The scheduler thread evaluates
+    every rule for each event and also runs delayed actions (such as
+    turning the LED off after `duration`) from a timer heap, so nothing
+    polls or sleeps in a loop.
+    """
+
+    def __init__(self, rules, led=None, publish=None):
+        self.rules = rules
+        self.led = led
+        self.publish = publish
+        self._events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._timers = []  # heap of (due, seq, key, callback)
+        self._timer_keys = {}  # key -> seq of the live timer, so rescheduling cancels the old one
+        self._seq = itertools.count()
+        self._thread = None
+        self._stopping = False
+
+        # Metrics
+        self.events = 0
+        self.dropped_events = 0
+        self.evaluations = 0
+        self.last_eval_ms = 0.0
+        self.max_eval_ms = 0.0
+        self.total_eval_ms = 0.0
+
+    # Event sources
+
+    def post(self, event, data=None):
+        """Queue an event from any thread. Never blocks."""
+        try:
+            self._events.put_nowait((event, data))
+        except queue.Full:
+            self.dropped_events += 1
+
+    def attach_motion_sensor(self, sensor):
+        """Post motion/no_motion on gpiozero edge callbacks."""
+        sensor.when_motion = lambda *args: self.post("motion")
+        sensor.when_no_motion = lambda *args: self.post("no_motion")
+
+    def attach_sampler(self, sampler):
+        """Post each new sensor reading as a "reading" event."""
+        sampler.add_listener(lambda reading: self.post("reading", reading))
+
+    # Lifecycle
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="automation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._events.put((None, None))
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopping:
+            timeout = None
+            if self._timers:
+                timeout = max(0.0, self._timers[0][0] - time.monotonic())
+            try:
+                event, data = self._events.get(timeout=timeout)
+                if event is not None:
+                    self.evaluate(event, data)
+            except queue.Empty:
+                pass
+            self._run_due_timers()
+
+    # Evaluation
+
+    def evaluate(self, event, data=None):
+        """Run every rule against one event and record how long it took."""
+        start = time.perf_counter()
+        now = time.monotonic()
+        self.events += 1
+        for rule in self.rules:
+            self.evaluations += 1
+            if rule.matches(event, data) and not rule.debounced(now):
+                try:
+                    self._fire(rule, data)
+                except Exception as e:
+                    print(f"Automation rule {rule.name} failed: {e}")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.last_eval_ms = elapsed_ms
+        self.max_eval_ms = max(self.max_eval_ms, elapsed_ms)
+        self.total_eval_ms += elapsed_ms
+
+    def _fire(self, rule, data):
+        print(f"Automation rule {rule.name} fired")
+        if rule.action == "led_on":
+            self.led.on()
+            if rule.duration:
+                self._schedule(rule.duration, self.led.off, key=("led_off", rule.name))
+        elif rule.action == "led_off":
+            self.led.off()
+        elif rule.action == "publish":
+            payload = rule.payload if rule.payload is not None else {"rule": rule.name, "reading": data}
+            self.publish(rule.topic, json.dumps(payload))
+
+    def _schedule(self, delay, callback, key=None):
+        """Run `callback` after `delay` seconds, replacing any timer with the same key. Scheduler thread only."""
+        seq = next(self._seq)
+        if key is not None:
+            self._timer_keys[key] = seq
+        heapq.heappush(self._timers, (time.monotonic() + delay, seq, key, callback))
+
+    def _run_due_timers(self):
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            _, seq, key, callback = heapq.heappop(self._timers)
+            if key is not None:
+                if self._timer_keys.get(key) != seq:
+                    continue  # Superseded by a later schedule() call
+                del self._timer_keys[key]
+            try:
+                callback()
+            except Exception as e:
+                print(f"Automation timer failed: {e}")
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "dropped_events": self.dropped_events,
+            "queue_depth": self._events.qsize(),
+            "pending_timers": len(self._timer_keys),
+            "last_eval_ms": round(self.last_eval_ms, 3),
+            "max_eval_ms": round(self.max_eval_ms, 3),
+            "avg_eval_ms": round(self.total_eval_ms / self.events, 3) if self.events else 0.0,
+            "fired": {rule.name: rule.fired for rule in self.rules},
+        }
+
+def create_engine(rules_path=AUTOMATION_RULES):
+    """Build an engine wired to the shared LED, MQTT client and sensor sampler."""
+    from app.led import get_led
+    from app.mqtt_client import mqtt_client
+    from app.sampler import sensor_sampler
+
+    engine = AutomationEngine(load_rules(rules_path), led=get_led(), publish=mqtt_client.publish_async)
+    engine.attach_sampler(sensor_sampler)
+    return engine
@@ -0,0 +1,77 @@
+import os
+import socket
+import threading
+import time
+
+PROBE_HOST = os.environ.get("CONNECTIVITY_PROBE_HOST", "8.8.8.8")  # Google's public DNS
+PROBE_PORT = int(os.environ.get("CONNECTIVITY_PROBE_PORT", 53))
+PROBE_TIMEOUT = float(os.environ.get("CONNECTIVITY_PROBE_TIMEOUT", 5.0))
+PROBE_TTL = float(os.environ.get("CONNECTIVITY_PROBE_TTL", 30.0))  # Seconds a probe result stays fresh
+
+class ConnectivityMonitor:
+    """
+    Tracks whether readings can be published without blocking the caller.
+
+    Once attached to an MQTT client, the broker connection state reported
+    by its on_connect/on_disconnect callbacks is authoritative. Before that
+    (or without a client), a TCP probe runs in a background thread at most
+    once per `ttl` seconds and the last result is returned from the cache.
+    """
+
+    def __init__(self, host=PROBE_HOST, port=PROBE_PORT, timeout=PROBE_TIMEOUT, ttl=PROBE_TTL):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.ttl = ttl
+        self._broker_connected = None  # None until a client reports its state
+        self._probe_result = False
+        self._probed_at = float("-inf")
+        self._probe_thread = None
+        self._lock = threading.Lock()
+
+    def is_online(self):
+        """Return the cached connectivity state. Never blocks on network I/O."""
+        if self._broker_connected is not None:
+            return self._broker_connected
+        if time.monotonic() - self._probed_at >= self.ttl:
+            self._probe_async()
+        return self._probe_result
+
+    def set_broker_state(self, connected):
+        self._broker_connected = connected
+
+    def attach(self, client):
+        """Follow `client`'s connection state, keeping any callbacks it already has."""
+        previous_connect = client.on_connect
+        previous_disconnect = client.on_disconnect
+
+        def on_connect(client, userdata, flags, rc, *args):
+            self.set_broker_state(rc == 0)
+            if previous_connect:
+                previous_connect(client, userdata, flags, rc, *args)
+
+        def on_disconnect(client, userdata, rc, *args):
+            self.set_broker_state(False)
+            if previous_disconnect:
+                previous_disconnect(client, userdata, rc, *args)
+
+        client.on_connect = on_connect
+        client.on_disconnect = on_disconnect
+
+    def _probe_async(self):
+        with self._lock:
+            if self._probe_thread is not None and self._probe_thread.is_alive():
+                return
+            self._probe_thread = threading.Thread(target=self._probe, name="connectivity-probe", daemon=True)
+            self._probe_thread.start()
+
+    def _probe(self):
+        try:
+            socket.create_connection((self.host, self.port), timeout=self.timeout).close()
+            self._probe_result = True
+        except OSError:
+            self._probe_result = False
+        self._probed_at = time.monotonic()
+
+# Shared monitor for the MQTT publisher
+connectivity_monitor = ConnectivityMonitor()
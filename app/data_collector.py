@@ -1,7 +1,177 @@
+import os
 import time
-from mqtt_client import publish_sensor_data
+from app import metrics
+from app.mqtt_client import publish_sensor_data
+from app.retention import retention_policy
+from app.sampler import SAMPLE_INTERVAL, sensor_sampler
+
+COLLECT_INTERVAL = float(os.environ.get("COLLECT_INTERVAL", 60.0))  # Seconds between stored/published readings
+COLLECT_MODE = os.environ.get("COLLECT_MODE", "fixed")  # "adaptive": store/publish only on change or heartbeat
+COLLECT_MIN_INTERVAL = float(os.environ.get("COLLECT_MIN_INTERVAL", SAMPLE_INTERVAL))  # Fastest adaptive check rate
+COLLECT_HEARTBEAT = float(os.environ.get("COLLECT_HEARTBEAT", 900.0))  # Seconds; a reading is sent at least this often
+COLLECT_STARTUP_WAIT = float(os.environ.get("COLLECT_STARTUP_WAIT", 10.0))  # Seconds to wait for the sampler's first reading
+DEADBANDS = {
+    "temperature": float(os.environ.get("DEADBAND_TEMPERATURE", 0.3)),  # °C change before a reading is sent
+    "humidity": float(os.environ.get("DEADBAND_HUMIDITY", 1.0)),  # % RH change before a reading is sent
+}
+
+COLLECTOR_READINGS = metrics.counter("smartnest_collector_readings_total",
+                                     "Adaptive collector checks, by outcome (changed, heartbeat, suppressed).",
+                                     ("outcome",))
+metrics.gauge("smartnest_collector_interval_seconds", "Current adaptive collector check interval.",
+              lambda: adaptive_collector.interval)
+
+class AdaptiveCollector:
+    """
+    Stores and publishes a reading only when a metric has moved by at least
+    its deadband since the last reading sent, or when `heartbeat` seconds
+    have passed without one.
+
+    The check interval adapts between `min_interval` and `max_interval`:
+    it halves while readings cross a deadband from one check to the next,
+    and doubles back while they are steady.
+    """
+
+    def __init__(self, deadbands=DEADBANDS, heartbeat=COLLECT_HEARTBEAT, min_interval=COLLECT_MIN_INTERVAL,
+                 max_interval=COLLECT_INTERVAL, read=sensor_sampler.latest, send=publish_sensor_data):
+        for metric, deadband in deadbands.items():
+            if deadband < 0:
+                raise ValueError(f"Deadband for {metric} must be >= 0, got {deadband}")
+        self.deadbands = dict(deadbands)  # 0 sends on any change
+        self.heartbeat = heartbeat
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        self.read = read
+        self.send = send
+        self.interval = max_interval
+        self._last_sent = None  # Reading the deadbands are measured from
+        self._last_sent_at = None
+        self._previous = None  # Reading from the last check
+        self._started_at = None
+
+        # Counters
+        self.checks = 0
+        self.sent = 0
+        self.heartbeats = 0
+        self.suppressed = 0
+        self.speedups = 0
+
+    def _changed(self, reading):
+        if self._last_sent is None:
+            return True
+        for metric, deadband in self.deadbands.items():
+            change = abs(reading[metric] - self._last_sent[metric])
+            if change >= deadband if deadband else change > 0:
+                return True
+        return False
+
+    def _adapt(self, reading):
+        """
+        Halve the interval if a metric moved a full deadband since the last
+        check, and double it if every metric moved less than a quarter of one.
+        Comparing against the deadband rather than a rate keeps sensor noise
+        at short intervals from holding the collector at full speed.
+        """
+        if self._previous is None:
+            return
+        moved = 0.0
+        for metric, deadband in self.deadbands.items():
+            change = abs(reading[metric] - self._previous[metric])
+            if deadband:
+                moved = max(moved, change / deadband)
+            elif change:
+                moved = float("inf")  # A zero deadband counts any change as a full one
+        if moved >= 1:
+            if self.interval > self.min_interval:
+                self.speedups += 1
+            self.interval = max(self.min_interval, self.interval / 2)
+        elif moved < 0.25:
+            self.interval = min(self.max_interval, self.interval * 2)
+
+    def step(self, now=None):
+        """Check the latest reading once, send it if needed, and return the seconds until the next check."""
+        now = time.monotonic() if now is None else now
+        if self._started_at is None:
+            self._started_at = now
+        try:
+            reading = self.read()
+        except Exception as e:
+            print(f"Error reading sensor data: {e}")
+            return self.interval
+        self.checks += 1
+
+        self._adapt(reading)
+        self._previous = reading
+
+        if self._changed(reading):
+            outcome = "changed"
+        elif now - self._last_sent_at >= self.heartbeat:
+            outcome = "heartbeat"
+            self.heartbeats += 1
+        else:
+            self.suppressed += 1
+            COLLECTOR_READINGS.inc(1, "suppressed")
+            return self.interval
+
+        self.send(reading)
+        self.sent += 1
+        self._last_sent = reading
+        self._last_sent_at = now
+        COLLECTOR_READINGS.inc(1, outcome)
+        return self.interval
+
+    def stats(self, now=None):
+        """
+        Return check/send counters and the saving against fixed mode, which
+        stores and publishes one reading every `max_interval` seconds. Each
+        reading sent is one database row and one MQTT message (or offline
+        journal entry).
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._started_at if self._started_at is not None else 0.0
+        fixed = int(elapsed // self.max_interval) + 1 if self._started_at is not None else 0
+        return {
+            "checks": self.checks,
+            "sent": self.sent,
+            "heartbeats": self.heartbeats,
+            "suppressed": self.suppressed,
+            "speedups": self.speedups,
+            "interval": self.interval,
+            "fixed_mode_sent": fixed,
+            "writes_saved_pct": round(100.0 * (1 - self.sent / fixed), 1) if fixed else 0.0,
+        }
+
+# Used by collect() in adaptive mode
+adaptive_collector = AdaptiveCollector()
+
+def collect(stop, interval=COLLECT_INTERVAL, mode=COLLECT_MODE):
+    """
+    Store and publish readings until `stop` is set: every `interval`
+    seconds in "fixed" mode, or on change/heartbeat in "adaptive" mode.
+    """
+    # The sampler starts with the collector; without a first reading the first pass would be lost
+    waited = 0.0
+    while not sensor_sampler.wait_ready(0.5) and not stop.is_set() and waited < COLLECT_STARTUP_WAIT:
+        waited += 0.5
+
+    while not stop.is_set():
+        wait = interval
+        try:
+            if mode == "adaptive":
+                wait = adaptive_collector.step()
+            else:
+                publish_sensor_data()
+            report = retention_policy.run_if_due()  # Once per RETENTION_INTERVAL, in small batches
+            if report:
+                print("Retention:", report)
+        except Exception as e:
+            print(f"Error in collector loop: {e}")  # Keep collecting; the next pass may succeed
+        stop.wait(wait)
+    if mode == "adaptive":
+        print("Adaptive collector:", adaptive_collector.stats())
 
 if __name__ == "__main__":
-    while True:
-        publish_sensor_data()
-        time.sleep(60)  # Run every 60 seconds
+    from app.services import run_forever
+
+    # Takes the same host lock as the web workers, so the two never sample twice
+    run_forever(("collector",))
@@ -0,0 +1,63 @@
+def lttb_indices(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of
+    at most `threshold` points that keep the visual shape of the series:
+    the first and last points, plus from each bucket the point forming
+    the largest triangle with the previous pick and the next bucket's
+    average. `xs` must be numeric and sorted.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    threshold = max(threshold, 3)
+
+    indices = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        indices.append(best)
+        a = best
+    indices.append(n - 1)
+    return indices
+
+def min_max_indices(xs, ys, threshold):
+    """
+    Min/max bucketing: split the series into threshold / 2 buckets and
+    keep each bucket's lowest and highest point, in x order. Preserves
+    every spike, at the cost of a noisier line than LTTB.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    buckets = max(1, threshold // 2)
+    every = n / buckets
+    indices = []
+    for b in range(buckets):
+        start, end = int(b * every), int((b + 1) * every)
+        if start >= end:
+            continue
+        low = high = start
+        for j in range(start + 1, end):
+            if ys[j] < ys[low]:
+                low = j
+            elif ys[j] > ys[high]:
+                high = j
+        indices.extend(sorted({low, high}))
+    return indices
+
+METHODS = {"lttb": lttb_indices, "minmax": min_max_indices}
@@ -0,0 +1,90 @@
+from app.storage import get_connection, transaction
+
+def create_device_tables(conn):
+    """Create the per-device reading and latest-state tables."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS device_readings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            device TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            temperature REAL NOT NULL,
+            humidity REAL NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_device_readings_device_timestamp ON device_readings (device, timestamp)")
+
+    # One row per node, so "latest reading" and the device list never scan device_readings
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS devices (
+            device TEXT PRIMARY KEY,
+            last_seen INTEGER NOT NULL,
+            temperature REAL NOT NULL,
+            humidity REAL NOT NULL,
+            readings INTEGER NOT NULL
+        )
+    ''')
+
+def save_device_readings_batch(readings):
+    """Save a batch of (device, timestamp, temperature, humidity) readings in one transaction."""
+    latest = {}
+    for reading in readings:
+        device, timestamp = reading[0], reading[1]
+        current = latest.get(device)
+        if current is None:
+            latest[device] = [reading, 1]
+        else:
+            current[1] += 1
+            if timestamp >= current[0][1]:
+                current[0] = reading
+
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO device_readings (device, timestamp, temperature, humidity) VALUES (?, ?, ?, ?)",
+            readings
+        )
+        conn.executemany(
+            '''
+            INSERT INTO devices (device, last_seen, temperature, humidity, readings)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (device) DO UPDATE SET
+                readings = readings + excluded.readings,
+                temperature = CASE WHEN excluded.last_seen >= last_seen THEN excluded.temperature ELSE temperature END,
+                humidity = CASE WHEN excluded.last_seen >= last_seen THEN excluded.humidity ELSE humidity END,
+                last_seen = MAX(last_seen, excluded.last_seen)
+            ''',
+            [(*reading, count) for reading, count in latest.values()]
+        )
+
+def fetch_devices():
+    """Return (device, last_seen, temperature, humidity, readings) for every known device."""
+    return get_connection().execute(
+        "SELECT device, last_seen, temperature, humidity, readings FROM devices ORDER BY device"
+    ).fetchall()
+
+def fetch_device(device):
+    """Return the devices row for `device`, or None if it never reported."""
+    return get_connection().execute(
+        "SELECT device, last_seen, temperature, humidity, readings FROM devices WHERE device = ?", (device,)
+    ).fetchone()
+
+def iter_device_history(device, start, end, limit, after=None):
+    """
+    Yield raw (id, timestamp, temperature, humidity) rows for one device
+    with start <= timestamp < end, oldest first. `after` is the
+    (timestamp, id) of the last row of the previous page.
+    """
+    after_ts, after_id = after or (start - 1, 0)
+    cursor = get_connection().execute(
+        '''
+        SELECT id, timestamp, temperature, humidity FROM device_readings
+        WHERE device = ? AND timestamp >= ? AND timestamp < ? AND (timestamp, id) > (?, ?)
+        ORDER BY timestamp, id
+        LIMIT ?
+        ''',
+        (device, start, end, after_ts, after_id, limit)
+    )
+    while True:
+        rows = cursor.fetchmany(500)
+        if not rows:
+            return
+        yield from rows
@@ -0,0 +1,160 @@
+import os
+import json
+import queue
+import time
+from datetime import datetime
+from app import metrics
+from app.ingest import IngestQueue
+from app.devices import save_device_readings_batch
+from app.mqtt_service import KEEPALIVE, MQTTService
+
+FLEET_TOPIC = os.environ.get("FLEET_TOPIC", "smartnest/+/sensor")  # "+" is the node name
+FLEET_CLIENT_ID = os.environ.get("FLEET_CLIENT_ID", "smartnest-fleet")
+FLEET_QOS = int(os.environ.get("FLEET_QOS", 1))
+FLEET_BATCH_SIZE = int(os.environ.get("FLEET_BATCH_SIZE", 500))  # Readings per transaction
+FLEET_FLUSH_INTERVAL = float(os.environ.get("FLEET_FLUSH_INTERVAL", 1.0))  # Seconds a reading may wait for its batch
+FLEET_MAX_BUFFER = int(os.environ.get("FLEET_MAX_BUFFER", 50000))
+FLEET_SUBMIT_TIMEOUT = float(os.environ.get("FLEET_SUBMIT_TIMEOUT", 1.0))  # Seconds per wait for room before retrying
+FLEET_MAX_STALL = float(os.environ.get("FLEET_MAX_STALL", KEEPALIVE / 2))  # Seconds one message may wait for room; keep well under the keepalive
+MAX_DEVICE_NAME = 64
+
+FLEET_STALLS = metrics.counter("smartnest_fleet_stalls_total",
+                               "Times the fleet subscriber held back MQTT acknowledgements waiting for ingest room.")
+FLEET_DROPPED = metrics.counter("smartnest_fleet_dropped_total",
+                                "Fleet readings lost because the ingest buffer stayed full past FLEET_MAX_STALL or at shutdown.")
+
+def _parse_timestamp(value, default):
+    """Accept epoch seconds or an ISO timestamp, as published by the collector."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp())
+
+def parse_message(topic, payload, now=None):
+    """
+    Turn one smartnest/<node>/sensor message into (device, timestamp,
+    temperature, humidity) rows. The payload is a reading object or a
+    list of them (an offline replay batch). Raises ValueError if the
+    topic or any reading is malformed.
+    """
+    parts = topic.split("/")
+    if len(parts) != 3 or not parts[1] or len(parts[1]) > MAX_DEVICE_NAME:
+        raise ValueError(f"Unexpected fleet topic '{topic}'")
+    device = parts[1]
+    now = now or int(time.time())
+
+    data = json.loads(payload)
+    readings = data if isinstance(data, list) else [data]
+    rows = []
+    for reading in readings:
+        try:
+            rows.append((device, _parse_timestamp(reading.get("timestamp"), now),
+                         float(reading["temperature"]), float(reading["humidity"])))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Malformed reading from {device}: {e!r}")
+    return rows
+
+class FleetSubscriber:
+    """
+    Consumes sensor readings from every node on FLEET_TOPIC and writes
+    them to device_readings through a batching IngestQueue. The MQTT
+    callback only parses and enqueues; one writer thread turns thousands
+    of messages per second into a few large transactions.
+
+    While the buffer is full the callback waits for room: paho sends the
+    QoS 1 PUBACK only after the callback returns, so the broker holds back
+    further messages until the writer catches up. The wait blocks paho's
+    network thread, which also sends the keepalive pings, so it is capped
+    at `max_stall` seconds per message (half the keepalive by default).
+    Readings still without room after that, or when the subscriber is
+    stopping, are dropped and counted rather than losing the connection
+    and, with it, every unacknowledged message of the clean session.
+    """
+
+    def __init__(self, service=None, topic=FLEET_TOPIC, qos=FLEET_QOS, ingest=None,
+                 submit_timeout=FLEET_SUBMIT_TIMEOUT, max_stall=FLEET_MAX_STALL):
+        self.service = service or MQTTService(client_id=FLEET_CLIENT_ID)
+        self.topic = topic
+        self.qos = qos
+        self.ingest = ingest or IngestQueue(batch_size=FLEET_BATCH_SIZE, flush_interval=FLEET_FLUSH_INTERVAL,
+                                            max_buffer=FLEET_MAX_BUFFER, writer=save_device_readings_batch)
+        self.submit_timeout = submit_timeout
+        self.max_stall = max_stall
+
+        # Metrics
+        self.messages = 0
+        self.readings = 0
+        self.malformed = 0
+        self.stalls = 0
+        self.dropped = 0
+        self._stopping = False
+
+    def start(self):
+        self._stopping = False
+        self.ingest.start()
+        self.service.subscribe(self.topic, self._on_message, qos=self.qos)
+        self.service.start()
+
+    def stop(self):
+        self._stopping = True  # Lets a callback waiting for room give up, so the network thread can exit
+        self.service.stop()
+        self.ingest.stop()
+
+    def _on_message(self, client, userdata, message):
+        self.messages += 1
+        try:
+            rows = parse_message(message.topic, message.payload)
+        except ValueError as e:
+            self.malformed += 1
+            print(f"Ignoring fleet message: {e}")
+            return
+        deadline = time.monotonic() + self.max_stall
+        for row in rows:
+            self._put(row, deadline)
+
+    def _put(self, row, deadline):
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                self.ingest.put(row, max(0.0, min(self.submit_timeout, remaining)))
+                self.readings += 1
+                return
+            except queue.Full:
+                if self._stopping or remaining <= 0:
+                    self.dropped += 1
+                    FLEET_DROPPED.inc()
+                    reason = "at shutdown" if self._stopping else f"for {self.max_stall:g}s"
+                    print(f"Dropped fleet reading from {row[0]}: ingest buffer full {reason}")
+                    return
+                self.stalls += 1
+                FLEET_STALLS.inc()
+
+    def stats(self):
+        return {
+            "messages": self.messages,
+            "readings": self.readings,
+            "malformed": self.malformed,
+            "stalls": self.stalls,
+            "dropped": self.dropped,
+            "ingest": self.ingest.stats(),
+            "mqtt": self.service.stats(),
+        }
+
+if __name__ == "__main__":
+    from app.models import setup_database
+
+    setup_database()
+    if metrics.METRICS_PORT:
+        metrics.start_http_server()  # No Flask in this process; expose /metrics on its own port
+    subscriber = FleetSubscriber()
+    subscriber.start()
+    print(f"Subscribed to {subscriber.topic}")
+    try:
+        while True:
+            time.sleep(60)
+            print("Fleet stats:", subscriber.stats())
+    except KeyboardInterrupt:
+        print("Fleet subscriber stopped by user")
+    finally:
+        subscriber.stop()
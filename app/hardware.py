@@ -0,0 +1,129 @@
+import os
+import platform
+import random
+import threading
+
+# "real" or "mock"; empty picks mock on Windows/Vercel and real hardware everywhere else
+HARDWARE = os.environ.get("HARDWARE", "")
+
+_factories = {}  # (backend, kind) -> factory
+_devices = []  # Devices created so far, closed by close_all()
+_lock = threading.Lock()
+_backend = None
+
+def register(backend, kind):
+    """Decorator registering `factory(*args)` as the `kind` driver for `backend`."""
+    def decorator(factory):
+        _factories[(backend, kind)] = factory
+        return factory
+    return decorator
+
+def backend():
+    """Return the selected backend. Chosen once per process; later calls reuse it."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                selected = HARDWARE
+                if not selected:
+                    selected = "mock" if platform.system() == "Windows" or os.environ.get("VERCEL") else "real"
+                if selected not in ("real", "mock"):
+                    raise ValueError(f"Unknown HARDWARE backend '{selected}', expected 'real' or 'mock'")
+                _backend = selected
+                print(f"Hardware backend: {_backend}")
+    return _backend
+
+def create(kind, *args):
+    """
+    Create a `kind` device ("led", "dht", "motion_sensor") on the selected
+    backend. Hardware libraries are only imported here, on first use.
+    """
+    factory = _factories.get((backend(), kind))
+    if factory is None:
+        raise ValueError(f"No '{kind}' driver for the {backend()} backend")
+    device = factory(*args)
+    with _lock:
+        _devices.append(device)
+    return device
+
+def close_all():
+    """Release every device created so far (frees GPIO pins on real hardware)."""
+    with _lock:
+        devices = _devices[:]
+        _devices.clear()
+    for device in devices:
+        close = getattr(device, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                print(f"Error closing {type(device).__name__}: {e}")
+
+# Real hardware
+
+@register("real", "led")
+def _real_led(pin):
+    from gpiozero import LED
+    return LED(pin)
+
+@register("real", "motion_sensor")
+def _real_motion_sensor(pin):
+    from gpiozero import MotionSensor
+    return MotionSensor(pin)
+
+@register("real", "dht")
+def _real_dht(pin):
+    import adafruit_dht
+    import board
+    return adafruit_dht.DHT11(getattr(board, f"D{pin}"))
+
+# Mock hardware for development and Vercel
+
+class MockLED:
+    def __init__(self, pin=None):
+        self.pin = pin
+        self.state = "OFF"
+
+    def on(self):
+        self.state = "ON"
+
+    def off(self):
+        self.state = "OFF"
+
+    @property
+    def is_lit(self):
+        return self.state == "ON"
+
+class MockDHT:
+    def __init__(self, pin=None):
+        self.pin = pin
+        self._temperature = 25.0
+        self._humidity = 50.0
+
+    @property
+    def temperature(self):
+        self._temperature += random.uniform(-0.5, 0.5)
+        return round(self._temperature, 1)
+
+    @property
+    def humidity(self):
+        self._humidity += random.uniform(-1, 1)
+        self._humidity = max(0, min(100, self._humidity))
+        return round(self._humidity, 1)
+
+class MockMotionSensor:
+    """Never detects motion on its own; call trigger() to simulate the PIR."""
+
+    def __init__(self, pin=None):
+        self.pin = pin
+        self.when_motion = None
+        self.when_no_motion = None
+
+    def trigger(self, motion=True):
+        callback = self.when_motion if motion else self.when_no_motion
+        if callback is not None:
+            callback()
+
+register("mock", "led")(MockLED)
+register("mock", "dht")(MockDHT)
+register("mock", "motion_sensor")(MockMotionSensor)
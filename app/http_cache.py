@@ -0,0 +1,198 @@
+import os
+import gzip
+import hashlib
+import time
+import zlib
+from datetime import date
+from functools import wraps
+from flask import current_app, request, session
+from flask_login import current_user
+from werkzeug.http import http_date
+from app.cache import LRUCache, MISSING
+from app.models import stored_data_version
+from app.usage_index import usage_version
+
+try:
+    import brotli  # Optional; gzip is used when it is not installed
+except ImportError:
+    brotli = None
+
+HTTP_CACHE = os.environ.get("HTTP_CACHE", "1") != "0"  # Set to 0 to disable response caching
+HTTP_COMPRESS = os.environ.get("HTTP_COMPRESS", "1") != "0"  # Set to 0 to disable gzip/brotli
+HTTP_CACHE_SIZE = int(os.environ.get("HTTP_CACHE_SIZE", 128))  # Rendered responses kept
+HTTP_CACHE_TTL = float(os.environ.get("HTTP_CACHE_TTL", 3600.0))  # Seconds; data changes invalidate sooner
+VERSION_TTL = float(os.environ.get("HTTP_VERSION_TTL", 1.0))  # Seconds a data fingerprint is reused before re-checking
+COMPRESS_MIN_SIZE = int(os.environ.get("HTTP_COMPRESS_MIN_SIZE", 512))  # Smaller bodies are sent as is
+GZIP_LEVEL = int(os.environ.get("HTTP_GZIP_LEVEL", 6))
+COMPRESSIBLE = ("text/html", "application/json", "text/css", "application/javascript", "text/csv")
+
+# Data a cached route depends on -> function returning its current fingerprint
+SOURCES = {
+    "sensor": stored_data_version,  # Any sensor or fleet insert, or a retention run
+    "usage": lambda: (date.today().isoformat(), usage_version()),  # A new or changed day file, or a new day
+}
+
+response_cache = LRUCache(maxsize=HTTP_CACHE_SIZE, ttl=HTTP_CACHE_TTL)
+_versions = {}  # source -> (checked_at, fingerprint, changed_at)
+_started_at = time.time()  # Last-Modified for routes that depend on no data (changes only on restart)
+_build = ""  # Fingerprint of the code and templates, set by init_app; part of every ETag
+
+def build_version(app):
+    """
+    Fingerprint the app package and templates (names, sizes, mtimes), so
+    a deploy that changes either invalidates every ETag. Identical across
+    the workers of one deploy.
+    """
+    digest = hashlib.sha1()
+    roots = [os.path.dirname(os.path.abspath(__file__))]
+    if app.template_folder:
+        roots.append(os.path.join(app.root_path, app.template_folder))
+    for root in roots:
+        for directory, subdirectories, filenames in os.walk(root):
+            subdirectories[:] = sorted(d for d in subdirectories if d != "__pycache__")
+            for filename in sorted(filenames):
+                path = os.path.join(directory, filename)
+                stat = os.stat(path)
+                digest.update(f"{os.path.relpath(path, root)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+def data_version(source):
+    """
+    Return (fingerprint, changed_at) for a data source. The fingerprint
+    is re-read at most every VERSION_TTL seconds, so a burst of requests
+    costs one check.
+    """
+    now = time.monotonic()
+    cached = _versions.get(source)
+    if cached is not None and now - cached[0] < VERSION_TTL:
+        return cached[1], cached[2]
+    fingerprint = SOURCES[source]()
+    changed_at = cached[2] if cached is not None and cached[1] == fingerprint else time.time()
+    _versions[source] = (now, fingerprint, changed_at)
+    return fingerprint, changed_at
+
+def _accepted_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def _gzip_stream(chunks):
+    """Gzip a streamed response chunk by chunk, in constant memory."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk if isinstance(chunk, bytes) else chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+class CachedResponse:
+    """A rendered response plus its compressed variants, built on first use."""
+    __slots__ = ("etag", "last_modified", "status", "headers", "body", "encoded")
+
+    def __init__(self, etag, last_modified, response):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.status = response.status_code
+        self.headers = [(k, v) for k, v in response.headers.items() if k.lower() not in ("content-length", "set-cookie")]
+        self.body = response.get_data()
+        self.encoded = {}
+
+    def variant(self, encoding):
+        if encoding is None or len(self.body) < COMPRESS_MIN_SIZE:
+            return None, self.body
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = _compress(self.body, encoding)
+        return encoding, body
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return etag in request.if_none_match
+    since = request.if_modified_since
+    return since is not None and int(last_modified) <= since.timestamp()
+
+def _validators(response, etag, last_modified):
+    response.set_etag(etag)
+    response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Cache-Control"] = "private, no-cache"  # Browsers revalidate; unchanged data costs a 304
+    response.vary.update(("Accept-Encoding", "Cookie"))
+    return response
+
+def cached(*sources):
+    """
+    Cache a view's response, keyed by route, query string and user, and
+    invalidated when any of `sources` ("sensor", "usage") changes.
+    Conditional requests get a 304 without running the view. Streamed
+    responses are not stored, but still get validators and compression.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not HTTP_CACHE or "_flashes" in session:  # Pending flash messages make a page one-off
+                return view(*args, **kwargs)
+
+            versions = [data_version(source) for source in sources]
+            last_modified = max([changed_at for _, changed_at in versions], default=_started_at)
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), current_user.get_id())
+            etag = hashlib.sha1(repr((_build, key, [v for v, _ in versions])).encode()).hexdigest()
+
+            if _not_modified(etag, last_modified):
+                return _validators(current_app.response_class(status=304), etag, last_modified)
+
+            entry = response_cache.get(key)
+            if entry is MISSING or entry.etag != etag:
+                response = view(*args, **kwargs)
+                response = current_app.make_response(response)
+                if response.status_code != 200:
+                    return response
+                if response.is_streamed:
+                    return _validators(response, etag, last_modified)
+                entry = CachedResponse(etag, last_modified, response)
+                response_cache.set(key, entry)
+
+            encoding, body = entry.variant(_accepted_encoding() if HTTP_COMPRESS else None)
+            response = current_app.response_class(body, status=entry.status, headers=entry.headers)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            return _validators(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+def compress_response(response):
+    """after_request hook: gzip/brotli JSON and HTML responses that were not compressed already."""
+    if (not HTTP_COMPRESS or response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE
+            or response.direct_passthrough):
+        return response
+    encoding = _accepted_encoding()
+    if encoding is None:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if response.is_streamed:
+        if encoding != "gzip":
+            encoding = "gzip" if request.accept_encodings["gzip"] else None
+        if encoding is None:
+            return response
+        response.response = _gzip_stream(response.response)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(_compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+def init_app(app):
+    global _build
+    _build = build_version(app)
+    app.after_request(compress_response)
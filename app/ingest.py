@@ -0,0 +1,209 @@
+import os
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from app import metrics
+from app.models import save_sensor_data_batch
+
+BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", 50))  # Flush once this many readings are buffered
+FLUSH_INTERVAL = float(os.environ.get("INGEST_FLUSH_INTERVAL", 30.0))  # ...or once the oldest reading is this old (seconds)
+MAX_BUFFER = int(os.environ.get("INGEST_MAX_BUFFER", 1000))  # Producers block when this many readings are pending
+SUBMIT_TIMEOUT = float(os.environ.get("INGEST_SUBMIT_TIMEOUT", 5.0))  # Seconds a producer waits for room before giving up
+RETRY_DELAY = float(os.environ.get("INGEST_RETRY_DELAY", 0.5))  # Seconds before retrying a failed flush, doubled up to the flush interval
+
+# Errors caused by the rows themselves (e.g. a NULL in a NOT NULL column); retrying won't help
+BAD_ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, TypeError, ValueError)
+
+class IngestQueue:
+    """
+    Buffers sensor readings in memory and writes them with one executemany
+    per transaction, flushing on whichever comes first of BATCH_SIZE
+    readings or FLUSH_INTERVAL seconds.
+
+    If a batch is rejected because of bad rows, it is written row by row
+    and only the bad rows are discarded. If the write fails for any other
+    reason (database locked, disk full), the batch goes back to the front
+    of the buffer, keeping at most `max_buffer` rows, for the next flush.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_buffer=MAX_BUFFER, writer=save_sensor_data_batch):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.writer = writer
+
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # Only one flush writes at a time
+        self._thread = None
+        self._stopping = False
+        self._last_flush = time.monotonic()
+
+        # Counters
+        self.submitted = 0
+        self.flushed = 0
+        self.rejected = 0
+        self.discarded = 0  # Bad rows, plus rows that no longer fit when a failed batch was re-queued
+        self.batches = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def submit(self, temperature, humidity, timestamp=None, timeout=SUBMIT_TIMEOUT):
+        """
+        Queue a reading (timestamp in epoch seconds) for the next flush.
+        Blocks while the buffer is full and raises queue.Full if no room
+        frees up within `timeout` seconds.
+        """
+        timestamp = timestamp or int(time.time())
+        self.put((timestamp, temperature, humidity), timeout)
+
+    def put(self, row, timeout=SUBMIT_TIMEOUT):
+        """Queue a row exactly as the writer expects it. Same blocking rules as submit()."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._buffer) < self.max_buffer, timeout):
+                self.rejected += 1
+                raise queue.Full("Sensor ingest buffer is full")
+            self._buffer.append(row)
+            self.submitted += 1
+            due = len(self._buffer) >= self.batch_size
+            if due:
+                self._cond.notify_all()
+
+        # Without a background thread the producer flushes inline
+        if self._thread is None and (due or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write every buffered reading in a single transaction. Returns the number written."""
+        with self._flush_lock:
+            with self._cond:
+                batch = list(self._buffer)
+                self._buffer.clear()
+                self._cond.notify_all()  # Wake producers waiting for room
+            self._last_flush = time.monotonic()
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                self.writer(batch)
+            except BAD_ROW_ERRORS as e:
+                print(f"Sensor data batch rejected ({e}); writing it row by row")
+                written = self._write_rows(batch)
+            except Exception:
+                self._requeue(batch)
+                raise
+            else:
+                written = len(batch)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            self.batches += 1
+            self.flushed += written
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+            return written
+
+    def _write_rows(self, batch):
+        """Write `batch` one row at a time, discarding rows the database rejects. Returns the number written."""
+        written = 0
+        for i, row in enumerate(batch):
+            try:
+                self.writer([row])
+                written += 1
+            except BAD_ROW_ERRORS as e:
+                self.discarded += 1
+                print(f"Discarding bad sensor reading {row!r}: {e}")
+            except Exception:
+                self.flushed += written
+                self._requeue(batch[i:])
+                raise
+        return written
+
+    def _requeue(self, batch):
+        """Put unwritten rows back in front of the buffer for the next flush, dropping the oldest that don't fit."""
+        with self._cond:
+            room = max(0, self.max_buffer - len(self._buffer))
+            if len(batch) > room:
+                self.discarded += len(batch) - room
+                print(f"Sensor ingest buffer full; discarding {len(batch) - room} unwritten readings")
+                batch = batch[len(batch) - room:]
+            self._buffer.extendleft(reversed(batch))
+            self.failed_flushes += 1
+
+    def start(self):
+        """Start the background flusher and flush whatever is left at interpreter exit."""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="sensor-ingest", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the background flusher and write any pending readings."""
+        thread = self._thread
+        if thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify_all()
+            thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing sensor data on shutdown: {e}")
+
+    def _run(self):
+        delay = RETRY_DELAY
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._buffer) >= self.batch_size,
+                    self.flush_interval,
+                )
+                stopping = self._stopping
+            try:
+                self.flush()
+                delay = RETRY_DELAY
+            except Exception as e:
+                print(f"Error flushing sensor data: {e}")
+                if not stopping:
+                    # A full buffer would otherwise retry at once, spinning while the database is unavailable
+                    with self._cond:
+                        self._cond.wait_for(lambda: self._stopping, min(self.flush_interval, delay))
+                    delay *= 2
+            if stopping:
+                return
+
+    def stats(self):
+        """Return queue depth and flush counters."""
+        with self._cond:
+            depth = len(self._buffer)
+        return {
+            "queue_depth": depth,
+            "max_buffer": self.max_buffer,
+            "submitted": self.submitted,
+            "flushed": self.flushed,
+            "rejected": self.rejected,
+            "discarded": self.discarded,
+            "batches": self.batches,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 3) if self.batches else 0.0,
+        }
+
+# Shared queue used by the collector and MQTT publisher
+ingest_queue = IngestQueue()
+
+metrics.gauge("smartnest_ingest_queue_depth", "Sensor readings buffered for the next batched write.",
+              lambda: ingest_queue.stats()["queue_depth"])
+metrics.gauge("smartnest_ingest_discarded", "Sensor readings discarded as bad rows or because a failed batch no longer fit.",
+              lambda: ingest_queue.discarded)
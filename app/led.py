@@ -1,18 +1,78 @@
 import os
-from gpiozero import LED
+import time
+import threading
+from app import hardware
+from app.sampler import write_shared_reading
+from app.storage import DB_FILE
 
-if os.environ.get("VERCEL") or os.name == "nt":  # Mock environment
-    class MockLED:
-        def __init__(self):
-            self.state = "OFF"
+LED_PIN = 17  # GPIO pin for the LED
+LED_STATE_FILE = os.environ.get("LED_STATE_FILE", DB_FILE + ".led.json")  # Last LED change, read by the other processes
 
-        def on(self):
-            self.state = "ON"
+_led = None
+_lock = threading.Lock()
+_listeners = []
 
-        def off(self):
-            self.state = "OFF"
+class NotifyingLED:
+    """
+    The hardware LED plus change notification: every on()/off(), from the
+    API or an automation rule, calls the listeners with "ON"/"OFF" and
+    records the change in LED_STATE_FILE for other processes on the host.
+    """
 
-    led = MockLED()
-else:
-    # Real LED using GPIO pin 17
-    led = LED(17)
+    def __init__(self, device, state_file=LED_STATE_FILE):
+        self.device = device
+        self.state_file = state_file
+
+    def on(self):
+        self.device.on()
+        self._changed("ON")
+
+    def off(self):
+        self.device.off()
+        self._changed("OFF")
+
+    def _changed(self, state):
+        try:
+            write_shared_reading(self.state_file, {"state": state, "pid": os.getpid(), "seq": time.time_ns()})
+        except OSError as e:
+            print(f"Error sharing LED state: {e}")
+        for callback in _listeners:
+            try:
+                callback(state)
+            except Exception as e:
+                print(f"Error in LED listener: {e}")
+
+    def __getattr__(self, name):
+        # is_lit, close(), pin, ... come from the device
+        return getattr(self.device, name)
+
+def add_listener(callback):
+    """Call `callback(state)` in this process after every LED change made in this process."""
+    _listeners.append(callback)
+
+def get_led():
+    """Return the shared LED, creating it on the selected hardware backend on first use."""
+    global _led
+    if _led is None:
+        with _lock:
+            if _led is None:
+                _led = NotifyingLED(hardware.create("led", LED_PIN))
+    return _led
+
+def control_led(state):
+    """Switch the LED "on" or "off" (case-insensitive) and return the new state."""
+    state = state.upper()
+    if state not in ("ON", "OFF"):
+        raise ValueError(f"Invalid LED state '{state}', expected ON or OFF")
+    led = get_led()
+    if state == "ON":
+        led.on()
+    else:
+        led.off()
+    return {"led": state}
+
+def __getattr__(name):
+    # Keeps `from app.led import led` working without touching GPIO at import time
+    if name == "led":
+        return get_led()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
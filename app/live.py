@@ -0,0 +1,132 @@
+import os
+import json
+import queue
+import threading
+from app import led
+from app.sampler import sensor_sampler, read_shared_reading
+
+CLIENT_BUFFER = int(os.environ.get("LIVE_CLIENT_BUFFER", 32))  # Events queued per client before it is dropped
+HEARTBEAT_INTERVAL = float(os.environ.get("LIVE_HEARTBEAT_INTERVAL", 15.0))  # Seconds between keep-alive comments
+LED_POLL_INTERVAL = float(os.environ.get("LIVE_LED_POLL_INTERVAL", 0.5))  # Seconds between checks for LED changes made by other processes
+
+class Subscriber:
+    """One connected dashboard client with its own bounded event buffer."""
+
+    def __init__(self, buffer_size):
+        self.queue = queue.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+class Broadcaster:
+    """
+    Fans out live events to every connected client from a single producer.
+
+    Each event is serialized once as a Server-Sent Events frame and put on
+    every subscriber's bounded queue without blocking. A client whose queue
+    is full is disconnected instead of slowing down the others.
+    """
+
+    def __init__(self, buffer_size=CLIENT_BUFFER):
+        self.buffer_size = buffer_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.events = 0
+        self.dropped_clients = 0
+
+    def subscribe(self):
+        subscriber = Subscriber(self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        """Send `data` (JSON-serializable) as an `event` to all subscribers."""
+        frame = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        with self._lock:
+            subscribers = list(self._subscribers)
+        self.events += 1
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(frame)
+            except queue.Full:
+                # Too slow to keep up; drop it and let the browser reconnect
+                subscriber.dropped = True
+                self.unsubscribe(subscriber)
+                self.dropped_clients += 1
+
+    def stream(self, subscriber, heartbeat=HEARTBEAT_INTERVAL):
+        """Yield SSE frames for `subscriber` until it is dropped or the client goes away."""
+        try:
+            yield "retry: 3000\n\n"
+            while not subscriber.dropped:
+                try:
+                    yield subscriber.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            clients = len(self._subscribers)
+        return {"clients": clients, "events": self.events, "dropped_clients": self.dropped_clients}
+
+class LedFollower:
+    """
+    Publishes "led" events for LED changes made by other processes (another
+    web worker, or the automation service), which record each change in
+    led.LED_STATE_FILE. Changes made in this process are published directly
+    by the LED listener. Changes seen while no client is connected are
+    skipped, not held for the next one.
+    """
+
+    def __init__(self, broadcaster, path=led.LED_STATE_FILE, interval=LED_POLL_INTERVAL):
+        self.broadcaster = broadcaster
+        self.path = path
+        self.interval = interval
+        self._last_seq = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def _read(self):
+        try:
+            return read_shared_reading(self.path)
+        except (OSError, ValueError):
+            return None
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            record = self._read()
+            self._last_seq = record["seq"] if record else None  # Don't replay the last change on connect
+            self._thread = threading.Thread(target=self._run, name="live-led", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._start_lock:
+            if self._thread is None:
+                return
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            record = self._read()
+            if record is None or record.get("seq") == self._last_seq:
+                continue
+            self._last_seq = record.get("seq")  # Advanced with no clients too, so nobody gets a stale change
+            if record.get("pid") != os.getpid() and self.broadcaster.stats()["clients"]:
+                self.broadcaster.publish("led", {"state": record["state"]})
+
+# Shared broadcaster; the sensor sampler is its producer for readings, the LED for "led" events
+live_broadcaster = Broadcaster()
+sensor_sampler.add_listener(lambda reading: live_broadcaster.publish("reading", reading))
+led.add_listener(lambda state: live_broadcaster.publish("led", {"state": state}))
+led_follower = LedFollower(live_broadcaster)
@@ -1,69 +1,261 @@
-import sqlite3
 import os
+import time
 from datetime import datetime
+from werkzeug.security import generate_password_hash
+from app import metrics
+from app.storage import get_connection, transaction
+from app.cache import LRUCache, MISSING
+from app.rollups import create_rollup_tables, apply_readings, backfill, iter_rollup_buckets, ROLLUP_FOR_BUCKET
+from app.devices import create_device_tables
 
-DB_FILE = os.environ.get("DB_FILE", "smartnest.db")
+# Bucket sizes accepted by the history queries, in seconds
+BUCKET_SIZES = {"1m": 60, "1h": 3600, "1d": 86400}
 
-def setup_database():
-    """Initialize the database with required tables."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 256))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 300.0))  # Seconds; bounds staleness across processes
 
-    # Create users table (already exists)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL
-        )
+class User:
+    """Logged-in user as Flask-Login expects it."""
+    __slots__ = ("id", "username", "password")
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, password):
+        self.id = id
+        self.username = username
+        self.password = password
+
+    def get_id(self):
+        return str(self.id)
+
+DB_WRITE_SECONDS = metrics.histogram("smartnest_db_write_seconds", "Time to insert and commit sensor readings.",
+                                     ("operation",))
+DB_ROWS_WRITTEN = metrics.counter("smartnest_db_rows_written_total", "Sensor readings committed to sensor_data.")
+
+# load_user runs on every authenticated request, so users are cached by id
+user_cache = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def _iso_to_epoch(value):
+    """Convert a legacy ISO (or numeric) timestamp to epoch seconds, or None if it can't be parsed."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError, OverflowError):
+        pass
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def _migrate_sensor_timestamps(conn):
+    """
+    Rewrite sensor_data from ISO text timestamps to integer epoch seconds.
+    Rows whose timestamp can't be parsed are logged and dropped rather than
+    stored as text in the INTEGER column.
+    """
+    conn.create_function("iso_to_epoch", 1, _iso_to_epoch, deterministic=True)
+    conn.execute("ALTER TABLE sensor_data RENAME TO sensor_data_legacy")
+    _create_sensor_table(conn)
+    skipped = conn.execute(
+        "SELECT id, timestamp FROM sensor_data_legacy WHERE iso_to_epoch(timestamp) IS NULL"
+    ).fetchall()
+    for row_id, timestamp in skipped:
+        print(f"Skipping sensor_data row {row_id}: unparseable timestamp {timestamp!r}")
+    conn.execute('''
+        INSERT INTO sensor_data (id, timestamp, temperature, humidity)
+        SELECT id, iso_to_epoch(timestamp), temperature, humidity FROM sensor_data_legacy
+        WHERE iso_to_epoch(timestamp) IS NOT NULL
     ''')
+    conn.execute("DROP TABLE sensor_data_legacy")
+    print(f"Migrated sensor_data timestamps to epoch seconds ({len(skipped)} unparseable rows skipped)")
 
-    # Create sensor_data table
-    cursor.execute('''
+def _create_sensor_table(conn):
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS sensor_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
             temperature REAL NOT NULL,
             humidity REAL NOT NULL
         )
     ''')
-    
-    conn.commit()
-    conn.close()
 
+def setup_database():
+    """Initialize the database with required tables."""
+    with transaction() as conn:
+        # Create users table (already exists)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password TEXT NOT NULL
+            )
+        ''')
+
+        # Create sensor_data table, upgrading databases that still store ISO text timestamps
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(sensor_data)")}
+        if columns.get("timestamp") == "TEXT":
+            _migrate_sensor_timestamps(conn)
+        else:
+            _create_sensor_table(conn)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sensor_data_timestamp ON sensor_data (timestamp)")
+
+        # Hourly/daily rollups, built from existing raw data the first time
+        if create_rollup_tables(conn):
+            backfill(conn)
+
+        # Readings from other nodes, received by the fleet subscriber
+        create_device_tables(conn)
+
+@metrics.timed(DB_WRITE_SECONDS, "save_sensor_data")
 def save_sensor_data(temperature, humidity):
     """Save sensor data to the database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    timestamp = datetime.now().isoformat()  # Current timestamp
-    cursor.execute(
-        "INSERT INTO sensor_data (timestamp, temperature, humidity) VALUES (?, ?, ?)",
-        (timestamp, temperature, humidity)
-    )
-    
-    conn.commit()
-    conn.close()
+    timestamp = int(time.time())  # Current timestamp, epoch seconds
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO sensor_data (timestamp, temperature, humidity) VALUES (?, ?, ?)",
+            (timestamp, temperature, humidity)
+        )
+        apply_readings(conn, [(timestamp, temperature, humidity)])
+    DB_ROWS_WRITTEN.inc()
     print(f"Saved data: Temperature={temperature}, Humidity={humidity} at {timestamp}")
 
+@metrics.timed(DB_WRITE_SECONDS, "save_sensor_data_batch")
+def save_sensor_data_batch(readings):
+    """Save a batch of (timestamp, temperature, humidity) readings in one transaction."""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO sensor_data (timestamp, temperature, humidity) VALUES (?, ?, ?)",
+            readings
+        )
+        apply_readings(conn, readings)
+    DB_ROWS_WRITTEN.inc(len(readings))
+    print(f"Saved {len(readings)} sensor readings")
+
 def fetch_all_sensor_data():
     """Fetch all sensor data from the database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM sensor_data")
-    rows = cursor.fetchall()
-    
-    conn.close()
-    return rows
+    return get_connection().execute("SELECT * FROM sensor_data").fetchall()
+
+def _iter_rows(cursor, chunk_size=500):
+    """Yield rows from a cursor without materializing the whole result."""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield from rows
+
+def iter_sensor_history(start, end, limit, after=None):
+    """
+    Yield raw (id, timestamp, temperature, humidity) rows with
+    start <= timestamp < end, oldest first. `after` is the
+    (timestamp, id) of the last row of the previous page.
+    """
+    after_ts, after_id = after or (start - 1, 0)
+    cursor = get_connection().execute(
+        '''
+        SELECT id, timestamp, temperature, humidity FROM sensor_data
+        WHERE timestamp >= ? AND timestamp < ? AND (timestamp, id) > (?, ?)
+        ORDER BY timestamp, id
+        LIMIT ?
+        ''',
+        (start, end, after_ts, after_id, limit)
+    )
+    return _iter_rows(cursor)
+
+def iter_sensor_buckets(start, end, bucket, limit, after=None):
+    """
+    Yield (bucket_start, count, temp min/max/avg, humidity min/max/avg) rows
+    aggregated into `bucket` ("1m", "1h" or "1d") windows aligned to the epoch.
+    `after` is the bucket_start of the last row of the previous page.
+    Hourly and daily buckets are read from the rollup tables.
+    """
+    size = BUCKET_SIZES[bucket]
+    if after is not None:
+        start = max(start, after + size)
+    if bucket in ROLLUP_FOR_BUCKET:
+        return _iter_rows(iter_rollup_buckets(get_connection(), bucket, start, end, limit))
+
+    cursor = get_connection().execute(
+        '''
+        SELECT (timestamp / ?) * ? AS bucket_start, COUNT(*),
+               MIN(temperature), MAX(temperature), AVG(temperature),
+               MIN(humidity), MAX(humidity), AVG(humidity)
+        FROM sensor_data
+        WHERE timestamp >= ? AND timestamp < ?
+        GROUP BY bucket_start
+        ORDER BY bucket_start
+        LIMIT ?
+        ''',
+        (size, size, start, end, limit)
+    )
+    return _iter_rows(cursor)
+
+def oldest_sensor_timestamp():
+    """Return the start of the oldest day with readings, including days only kept as rollups, or None."""
+    return get_connection().execute("SELECT MIN(bucket_start) FROM sensor_rollup_daily").fetchone()[0]
+
+def sensor_data_version(start, end, bucket=None):
+    """
+    Return a cheap fingerprint of the readings in [start, end): it changes
+    whenever a reading in the range is added or removed. Used for ETags.
+    """
+    if bucket in ROLLUP_FOR_BUCKET:
+        size = BUCKET_SIZES[bucket]
+        return get_connection().execute(
+            f"SELECT COUNT(*), SUM(count), MAX(last_timestamp) FROM {ROLLUP_FOR_BUCKET[bucket]} "
+            "WHERE bucket_start >= ? AND bucket_start < ?",
+            ((start // size) * size, end)
+        ).fetchone()
+    return get_connection().execute(
+        "SELECT COUNT(*), MAX(id) FROM sensor_data WHERE timestamp >= ? AND timestamp < ?", (start, end)
+    ).fetchone()
+
+def stored_data_version():
+    """
+    Return a fingerprint of everything stored from the sensors: it changes
+    on every insert (raw or fleet) and whenever retention removes rows.
+    Each part is a single b-tree seek, so it is cheap to call per request.
+    """
+    return get_connection().execute(
+        '''
+        SELECT (SELECT MIN(id) FROM sensor_data), (SELECT MAX(id) FROM sensor_data),
+               (SELECT MIN(bucket_start) FROM sensor_rollup_hourly),
+               (SELECT MIN(id) FROM device_readings), (SELECT MAX(id) FROM device_readings)
+        '''
+    ).fetchone()
 
 def load_user(user_id):
-    """Load a user by ID."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-    user = cursor.fetchone()
-    
-    conn.close()
+    """Load a user by ID, from the cache when possible."""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    user = user_cache.get(user_id)
+    if user is not MISSING:
+        return user
+
+    row = get_connection().execute("SELECT id, username, password FROM users WHERE id = ?", (user_id,)).fetchone()
+    if row is None:
+        return None
+    user = User(*row)
+    user_cache.set(user_id, user)
     return user
+
+def add_user(username, password):
+    """Create a user. Raises sqlite3.IntegrityError if the username is taken."""
+    hashed_password = generate_password_hash(password, method="pbkdf2:sha256")
+    with transaction() as conn:
+        user_id = conn.execute(
+            "INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password)
+        ).lastrowid
+    user_cache.invalidate(user_id)
+    return user_id
+
+def update_password(user_id, new_password):
+    """Change a user's password and drop their cached entry."""
+    hashed_password = generate_password_hash(new_password, method="pbkdf2:sha256")
+    with transaction() as conn:
+        conn.execute("UPDATE users SET password = ? WHERE id = ?", (hashed_password, user_id))
+    user_cache.invalidate(int(user_id))
@@ -1,85 +1,77 @@
-import os
 import json
 import time
 from datetime import datetime
-from app.sensors import read_sensor
-from app.mqtt_client import mqtt_client  # Assumes MQTT client is initialized elsewhere
-from app.models import save_sensor_data
+from app import metrics
+from app.sampler import sensor_sampler
+from app.mqtt_service import MQTTService, SENSOR_TOPIC
+from app.ingest import ingest_queue
+from app.offline_journal import offline_journal
+from app.offline_replay import offline_replayer
+from app.connectivity import connectivity_monitor
 
+# Single long-lived client for this process; started on first async publish or by the collector
+mqtt_client = MQTTService()
 
-DATA_DIR = os.environ.get("DATA_DIR", "data")
-OFFLINE_FILE = os.path.join(DATA_DIR, "offline_data.json")
+# Broker connection state drives is_connected(); the TCP probe is only a fallback
+connectivity_monitor.attach(mqtt_client.client)
+
+PUBLISH_SECONDS = metrics.histogram("smartnest_mqtt_publish_seconds", "Time spent in the collector's publish steps.",
+                                    ("operation",))
+metrics.gauge("smartnest_mqtt_connected", "1 while the MQTT client is connected to the broker.",
+              lambda: int(mqtt_client.is_connected()))
+metrics.gauge("smartnest_mqtt_queue_depth", "Messages waiting for the MQTT publish worker.",
+              lambda: mqtt_client.stats()["queue_depth"])
+metrics.gauge("smartnest_mqtt_dropped", "Messages dropped because the MQTT publish queue was full.",
+              lambda: mqtt_client.dropped)
 
 def is_connected():
-    """Check if the Raspberry Pi is connected to the internet."""
-    import socket
-    try:
-        socket.create_connection(("8.8.8.8", 53), timeout=5)  # Google's public DNS
-        return True
-    except OSError:
-        return False
+    """Check if readings can be published, from cached broker/probe state (never blocks)."""
+    return connectivity_monitor.is_online()
 
 def store_data_offline(data):
-    """Store data in the offline file."""
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-
-    if os.path.exists(OFFLINE_FILE):
-        with open(OFFLINE_FILE, "r") as file:
-            try:
-                existing_data = json.load(file)
-            except json.JSONDecodeError:
-                existing_data = []
-    else:
-        existing_data = []
-
-    existing_data.append(data)
-    with open(OFFLINE_FILE, "w") as file:
-        json.dump(existing_data, file)
+    """Append data to the offline journal."""
+    offline_journal.append(data)
 
+@metrics.timed(PUBLISH_SECONDS, "publish_offline_data")
 def publish_offline_data():
-    """Publish offline data when the internet is available."""
-    if not os.path.exists(OFFLINE_FILE):
-        return
-
-    with open(OFFLINE_FILE, "r") as file:
-        try:
-            offline_data = json.load(file)
-        except json.JSONDecodeError:
-            offline_data = []
-
-    for entry in offline_data:
-        try:
-            # Publish data to MQTT or database
-            mqtt_client.publish("smartnest/sensor", json.dumps(entry))
-        except Exception as e:
-            print(f"Error publishing data: {e}")
-            return  # Stop if publishing fails to retry later
-
-    # If all data is successfully published, delete the offline file
-    os.remove(OFFLINE_FILE)
+    """
+    Publish offline data when the internet is available, as rate-limited
+    QoS 1 batches that resume from the last acknowledged reading.
+    """
+    try:
+        count = offline_replayer.run(mqtt_client)
+        if count:
+            print(f"Published {count} offline readings:", offline_replayer.stats())
+    except Exception as e:
+        print(f"Error publishing data: {e}")  # Replay resumes after the last acknowledged batch
 
-def publish_sensor_data():
-    """Read sensor data, save to DB, and publish if connected."""
+@metrics.timed(PUBLISH_SECONDS, "publish_sensor_data")
+def publish_sensor_data(sensor_data=None):
+    """Read sensor data (unless a reading is given), save to DB, and publish if connected."""
     try:
-        sensor_data = read_sensor()
+        if sensor_data is None:
+            sensor_data = sensor_sampler.latest()  # Cached reading; raises if too stale
+        now = datetime.now()
         timestamped_data = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "temperature": sensor_data["temperature"],
             "humidity": sensor_data["humidity"]
         }
 
-        # Save to database
-        save_sensor_data(
+        # Queue for the next batched database write
+        ingest_queue.submit(
             temperature=sensor_data["temperature"],
-            humidity=sensor_data["humidity"]
+            humidity=sensor_data["humidity"],
+            timestamp=int(now.timestamp())
         )
 
         if is_connected():
-            # Publish data to MQTT
-            mqtt_client.publish("smartnest/sensor", json.dumps(timestamped_data))
+            # Flush anything buffered during an outage first, then publish data to MQTT
+            publish_offline_data()
+            mqtt_client.publish_async(SENSOR_TOPIC, json.dumps(timestamped_data))
             print("Published sensor data:", timestamped_data)
         else:
+            store_data_offline(timestamped_data)
             print("Stored data locally. No internet connection.")
     except Exception as e:
         print(f"Error reading or processing sensor data: {e}")
@@ -0,0 +1,175 @@
+import os
+import queue
+import threading
+import time
+import paho.mqtt.client as mqtt
+
+BROKER = os.environ.get("BROKER", "localhost")
+PORT = int(os.environ.get("PORT", 1883))
+CLIENT_ID = os.environ.get("MQTT_CLIENT_ID", "")
+KEEPALIVE = int(os.environ.get("MQTT_KEEPALIVE", 60))
+QUEUE_SIZE = int(os.environ.get("MQTT_QUEUE_SIZE", 1000))  # Outbound messages waiting for the worker
+RECONNECT_MIN_DELAY = int(os.environ.get("MQTT_RECONNECT_MIN_DELAY", 1))  # Seconds, doubled after each failed attempt
+RECONNECT_MAX_DELAY = int(os.environ.get("MQTT_RECONNECT_MAX_DELAY", 120))
+NODE_ID = os.environ.get("NODE_ID", "")  # Fleet node name; when set, readings go to smartnest/<node>/sensor
+SENSOR_TOPIC = f"smartnest/{NODE_ID}/sensor" if NODE_ID else "smartnest/sensor"
+
+class MQTTService:
+    """
+    One long-lived paho-mqtt client per process.
+
+    paho's network loop runs in its own thread and reconnects with
+    exponential backoff between RECONNECT_MIN_DELAY and RECONNECT_MAX_DELAY.
+    publish_async() only enqueues, so request handlers return immediately;
+    a worker thread hands queued messages to paho while the broker is
+    connected. publish() is the synchronous path for callers that need the
+    MQTTMessageInfo (e.g. to wait for a QoS 1 acknowledgement).
+    """
+
+    def __init__(self, broker=BROKER, port=PORT, client_id=CLIENT_ID, keepalive=KEEPALIVE,
+                 queue_size=QUEUE_SIZE, reconnect_min_delay=RECONNECT_MIN_DELAY,
+                 reconnect_max_delay=RECONNECT_MAX_DELAY):
+        self.broker = broker
+        self.port = port
+        self.keepalive = keepalive
+        self.client = mqtt.Client(client_id=client_id)
+        self.client.reconnect_delay_set(min_delay=reconnect_min_delay, max_delay=reconnect_max_delay)
+        self.client.max_queued_messages_set(queue_size)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._subscriptions = {}  # topic -> qos, renewed on every connect
+        self._connected = threading.Event()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._stopping = False
+
+        # Metrics
+        self.connects = 0
+        self.disconnects = 0
+        self.published = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.total_latency_ms = 0.0
+
+    # Lifecycle
+
+    def start(self):
+        """Connect in the background and start the network loop and publish worker. Safe to call repeatedly."""
+        with self._start_lock:
+            if self._worker is not None:
+                return
+            self._stopping = False
+            self.client.connect_async(self.broker, self.port, self.keepalive)
+            self.client.loop_start()
+            self._worker = threading.Thread(target=self._run, name="mqtt-publisher", daemon=True)
+            self._worker.start()
+
+    def stop(self, timeout=5.0):
+        """Send what is queued (up to `timeout` seconds), then disconnect."""
+        with self._start_lock:
+            if self._worker is None:
+                return
+            deadline = time.monotonic() + timeout
+            while not self._queue.empty() and self._connected.is_set() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self._stopping = True
+            try:
+                self._queue.put_nowait(None)  # Wake the worker
+            except queue.Full:
+                pass  # The worker sees _stopping on its next message
+            self._worker.join(timeout)
+            self._worker = None
+            self.client.disconnect()
+            self.client.loop_stop()
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            self.connects += 1
+            self._connected.set()
+            for topic, qos in self._subscriptions.items():
+                client.subscribe(topic, qos)
+            print(f"Connected to MQTT broker at {self.broker}:{self.port}")
+        else:
+            print(f"MQTT connection refused: {mqtt.connack_string(rc)}")
+
+    def _on_disconnect(self, client, userdata, rc):
+        self._connected.clear()
+        if rc != 0:
+            self.disconnects += 1
+            print(f"Disconnected from MQTT broker ({mqtt.error_string(rc)}), reconnecting")
+
+    # Subscribing
+
+    def subscribe(self, topic, callback, qos=0):
+        """
+        Subscribe to `topic` (wildcards allowed) now and after every
+        reconnect. `callback(client, userdata, message)` runs on paho's
+        network thread, so it should hand work off rather than block.
+        """
+        self.client.message_callback_add(topic, callback)
+        self._subscriptions[topic] = qos
+        if self.is_connected():
+            self.client.subscribe(topic, qos)
+
+    # Publishing
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        """Publish synchronously from the calling thread and return paho's MQTTMessageInfo."""
+        return self.client.publish(topic, payload, qos=qos, retain=retain)
+
+    def publish_async(self, topic, payload, qos=0, retain=False):
+        """Queue a message and return immediately. Returns False if the queue is full and it was dropped."""
+        if self._worker is None:
+            self.start()
+        try:
+            self._queue.put_nowait((time.perf_counter(), topic, payload, qos, retain))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None or self._stopping:
+                return
+            queued_at, topic, payload, qos, retain = item
+
+            # Hold messages while disconnected; the bounded queue absorbs short outages
+            while not self._connected.wait(1.0):
+                if self._stopping:
+                    return
+
+            info = self.client.publish(topic, payload, qos=qos, retain=retain)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                self.failed += 1
+                print(f"Error publishing to {topic}: {mqtt.error_string(info.rc)}")
+                continue
+
+            latency_ms = (time.perf_counter() - queued_at) * 1000
+            self.published += 1
+            self.last_latency_ms = latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+            self.total_latency_ms += latency_ms
+
+    def stats(self):
+        """Return connection state, queue depth and publish latency."""
+        return {
+            "connected": self.is_connected(),
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "queue_depth": self._queue.qsize(),
+            "published": self.published,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "last_latency_ms": round(self.last_latency_ms, 3),
+            "max_latency_ms": round(self.max_latency_ms, 3),
+            "avg_latency_ms": round(self.total_latency_ms / self.published, 3) if self.published else 0.0,
+        }
@@ -0,0 +1,212 @@
+import os
+import json
+import threading
+
+DATA_DIR = os.environ.get("DATA_DIR", "data")
+OFFLINE_DIR = os.environ.get("OFFLINE_DIR", os.path.join(DATA_DIR, "offline"))
+LEGACY_OFFLINE_FILE = os.path.join(DATA_DIR, "offline_data.json")
+SEGMENT_MAX_BYTES = int(os.environ.get("OFFLINE_SEGMENT_BYTES", 256 * 1024))  # Start a new segment past this size
+CURSOR_SYNC_EVERY = int(os.environ.get("OFFLINE_CURSOR_SYNC_EVERY", 50))  # Persist the replay cursor every N records
+FSYNC = os.environ.get("OFFLINE_FSYNC", "1") == "1"  # fsync each append so a power cut loses nothing acknowledged
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+
+class OfflineJournal:
+    """
+    Append-only store for readings that could not be published.
+
+    Readings are written as JSON lines into numbered segment files. A
+    cursor file records the segment and byte offset of the next reading to
+    replay, so an interrupted replay resumes where it stopped. Segments are
+    deleted once every reading in them has been replayed. Delivery is
+    at-least-once: after a crash up to CURSOR_SYNC_EVERY readings may be
+    sent again.
+    """
+
+    def __init__(self, directory=OFFLINE_DIR, segment_max_bytes=SEGMENT_MAX_BYTES,
+                 cursor_sync_every=CURSOR_SYNC_EVERY, fsync=FSYNC):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.cursor_sync_every = cursor_sync_every
+        self.fsync = fsync
+        self.cursor_file = os.path.join(directory, "cursor.json")
+        self._lock = threading.RLock()
+        self._writer = None
+        self._writer_segment = None
+        self._opened = False
+
+    # Segment bookkeeping
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}")
+
+    def _segments(self):
+        """Return the numbers of all segment files, oldest first."""
+        numbers = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX):
+                numbers.append(int(filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(numbers)
+
+    def _read_cursor(self):
+        try:
+            with open(self.cursor_file, "r") as f:
+                cursor = json.load(f)
+            return cursor["segment"], cursor["offset"]
+        except (OSError, ValueError, KeyError):
+            segments = self._segments()
+            return (segments[0] if segments else 0), 0
+
+    def _write_cursor(self, segment, offset):
+        tmp_path = self.cursor_file + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"segment": segment, "offset": offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.cursor_file)
+
+    def _open(self):
+        """Create the directory, repair a torn final write and import the legacy JSON file."""
+        if self._opened:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segments()
+        if segments:
+            self._truncate_partial_line(self._segment_path(segments[-1]))
+        self._opened = True
+        self._import_legacy_file()
+
+    def _truncate_partial_line(self, path):
+        """Drop a trailing record left half-written by a power loss."""
+        with open(path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _import_legacy_file(self):
+        """Move readings from the old single-file offline_data.json into the journal."""
+        if not os.path.exists(LEGACY_OFFLINE_FILE):
+            return
+        try:
+            with open(LEGACY_OFFLINE_FILE, "r") as file:
+                entries = json.load(file)
+        except json.JSONDecodeError:
+            entries = []
+        for entry in entries:
+            self.append(entry)
+        os.remove(LEGACY_OFFLINE_FILE)
+
+    # Public API
+
+    def append(self, entry):
+        """Append one reading. O(1) regardless of how much is already buffered."""
+        line = (json.dumps(entry) + "\n").encode()
+        with self._lock:
+            self._open()
+            if self._writer is None or self._writer.tell() >= self.segment_max_bytes:
+                self._roll_segment()
+            self._writer.write(line)
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+
+    def _roll_segment(self):
+        if self._writer is not None:
+            self._writer.close()
+            number = self._writer_segment + 1
+        else:
+            # Never reuse a number at or behind the replay cursor
+            segments = self._segments()
+            cursor_segment, _ = self._read_cursor()
+            number = max(segments[-1] if segments else 1, cursor_segment, 1)
+            path = self._segment_path(number)
+            if os.path.exists(path) and os.path.getsize(path) >= self.segment_max_bytes:
+                number += 1
+        self._writer = open(self._segment_path(number), "ab")
+        self._writer_segment = number
+
+    def iter_pending(self):
+        """
+        Yield (entry, position) for each buffered reading, oldest first,
+        starting at the persisted cursor. Pass a position to commit() once
+        that reading and everything before it has been delivered.
+        """
+        with self._lock:
+            self._open()
+            segment, offset = self._read_cursor()
+            segments = [number for number in self._segments() if number >= segment]
+
+        for number in segments:
+            position = offset if number == segment else 0
+            try:
+                f = open(self._segment_path(number), "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                f.seek(position)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Write in progress or torn; picked up on a later replay
+                    position += len(line)
+                    try:
+                        entry = json.loads(line) if line.strip() else None
+                    except ValueError:
+                        print(f"Skipping corrupt offline record in segment {number}")
+                        continue
+                    if entry is not None:
+                        yield entry, (number, position)
+
+    def commit(self, position):
+        """Persist the replay cursor at `position` and delete segments that are fully replayed."""
+        segment, offset = position
+        with self._lock:
+            path = self._segment_path(segment)
+            if segment != self._writer_segment and (not os.path.exists(path) or offset >= os.path.getsize(path)):
+                segment, offset = segment + 1, 0  # Finished a segment that is no longer written to
+            self._write_cursor(segment, offset)
+            for number in self._segments():
+                if number < segment:
+                    os.remove(self._segment_path(number))
+
+    def replay(self, publish, limit=None):
+        """
+        Call `publish(entry)` for buffered readings in order, starting at the
+        persisted cursor. Stops at the first exception, leaving that reading
+        to be retried next time. Returns the number of readings published.
+        """
+        published, position = 0, None
+        try:
+            for entry, next_position in self.iter_pending():
+                if limit is not None and published >= limit:
+                    break
+                publish(entry)
+                published += 1
+                position = next_position
+                if published % self.cursor_sync_every == 0:
+                    self.commit(position)
+        finally:
+            if position is not None:
+                self.commit(position)
+        return published
+
+    def pending_bytes(self):
+        """Approximate size of readings not yet replayed."""
+        with self._lock:
+            self._open()
+            segment, offset = self._read_cursor()
+            total = 0
+            for number in self._segments():
+                if number >= segment:
+                    total += os.path.getsize(self._segment_path(number)) - (offset if number == segment else 0)
+            return total
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                self._writer_segment = None
+
+# Shared journal used by the MQTT publisher
+offline_journal = OfflineJournal()
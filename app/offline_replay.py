@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from app.offline_journal import offline_journal
+from app.mqtt_service import NODE_ID, SENSOR_TOPIC
+
+# A fleet node replays to its own sensor topic, where app.fleet accepts a list of readings
+REPLAY_TOPIC = os.environ.get("REPLAY_TOPIC", SENSOR_TOPIC if NODE_ID else "smartnest/sensor/batch")
+REPLAY_BATCH_SIZE = int(os.environ.get("REPLAY_BATCH_SIZE", 50))  # Readings per batch message
+REPLAY_MAX_INFLIGHT = int(os.environ.get("REPLAY_MAX_INFLIGHT", 5))  # Unacknowledged batch messages allowed at once
+REPLAY_RATE = float(os.environ.get("REPLAY_RATE", 5.0))  # Batch messages per second, 0 for unthrottled
+REPLAY_ACK_TIMEOUT = float(os.environ.get("REPLAY_ACK_TIMEOUT", 10.0))  # Seconds to wait for a PUBACK
+
+class OfflineReplayer:
+    """
+    Replays the offline journal to the broker as QoS 1 batch messages.
+
+    Each message carries a JSON list of up to `batch_size` readings. At most
+    `max_inflight` messages are awaiting a PUBACK at any time and sends are
+    spaced to `rate` messages per second. The journal cursor only moves past
+    a batch once the broker has acknowledged it (and every batch before it),
+    so an interrupted replay resends unacknowledged batches next time.
+    """
+
+    def __init__(self, journal=offline_journal, topic=REPLAY_TOPIC, batch_size=REPLAY_BATCH_SIZE,
+                 max_inflight=REPLAY_MAX_INFLIGHT, rate=REPLAY_RATE, ack_timeout=REPLAY_ACK_TIMEOUT):
+        self.journal = journal
+        self.topic = topic
+        self.batch_size = batch_size
+        self.max_inflight = max_inflight
+        self.rate = rate
+        self.ack_timeout = ack_timeout
+        self._run_lock = threading.Lock()
+        self._next_send = 0.0
+        self._inflight = deque()  # (message info, journal position, reading count)
+
+        # Progress of the current or last replay
+        self.running = False
+        self.started_at = None
+        self.finished_at = None
+        self.batches_sent = 0
+        self.batches_acked = 0
+        self.readings_acked = 0
+        self.last_error = None
+
+    def run(self, client):
+        """Replay everything in the journal through `client`. Returns the number of readings acknowledged."""
+        if not self._run_lock.acquire(blocking=False):
+            return 0  # A replay is already in progress
+        try:
+            self._reset()
+            batch, position = [], None
+            for entry, position in self.journal.iter_pending():
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    self._send(client, batch, position)
+                    batch = []
+            if batch:
+                self._send(client, batch, position)
+            while self._inflight:
+                self._ack_oldest()
+            return self.readings_acked
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self._inflight.clear()  # Unacknowledged batches are resent next time
+            self.running = False
+            self.finished_at = time.monotonic()
+            self._run_lock.release()
+
+    def _reset(self):
+        self.running = True
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.batches_sent = 0
+        self.batches_acked = 0
+        self.readings_acked = 0
+        self.last_error = None
+
+    def _send(self, client, batch, position):
+        while len(self._inflight) >= self.max_inflight:
+            self._ack_oldest()
+
+        if self.rate > 0:
+            delay = self._next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_send = max(self._next_send, time.monotonic()) + 1.0 / self.rate
+
+        info = client.publish(self.topic, json.dumps(batch), qos=1)
+        if info.rc != 0:
+            raise RuntimeError(f"Publish failed with code {info.rc}")
+        self._inflight.append((info, position, len(batch)))
+        self.batches_sent += 1
+
+    def _ack_oldest(self):
+        info, position, count = self._inflight[0]
+        info.wait_for_publish(self.ack_timeout)
+        if not info.is_published():
+            raise TimeoutError(f"No PUBACK for message {info.mid} after {self.ack_timeout}s")
+        self._inflight.popleft()
+        self.journal.commit(position)
+        self.batches_acked += 1
+        self.readings_acked += count
+
+    def stats(self):
+        """Return replay progress and throughput."""
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        elapsed = end - self.started_at if self.started_at is not None else 0.0
+        return {
+            "running": self.running,
+            "batches_sent": self.batches_sent,
+            "batches_acked": self.batches_acked,
+            "readings_acked": self.readings_acked,
+            "inflight": len(self._inflight),
+            "pending_bytes": self.journal.pending_bytes(),
+            "elapsed_s": round(elapsed, 3),
+            "readings_per_sec": round(self.readings_acked / elapsed, 1) if elapsed > 0 else 0.0,
+            "last_error": self.last_error,
+        }
+
+# Shared replayer for the offline journal
+offline_replayer = OfflineReplayer()
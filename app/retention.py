@@ -0,0 +1,167 @@
+import os
+import json
+import time
+from app import storage
+from app.storage import get_connection, transaction
+from app.rollups import ROLLUP_TABLES
+
+RAW_RETENTION_DAYS = float(os.environ.get("RETENTION_RAW_DAYS", 30))  # Raw sensor_data kept; older data lives on in the rollups
+HOURLY_RETENTION_DAYS = float(os.environ.get("RETENTION_HOURLY_DAYS", 365))  # 0 keeps hourly rollups forever
+DAILY_RETENTION_DAYS = float(os.environ.get("RETENTION_DAILY_DAYS", 0))  # 0 keeps daily rollups forever
+DEVICE_RETENTION_DAYS = float(os.environ.get("RETENTION_DEVICE_DAYS", 0))  # Fleet device_readings; 0 keeps them forever
+DELETE_BATCH = int(os.environ.get("RETENTION_DELETE_BATCH", 2000))  # Rows deleted per transaction
+BATCH_PAUSE = float(os.environ.get("RETENTION_BATCH_PAUSE", 0.05))  # Seconds between batches so writers get the lock
+VACUUM_PAGES = int(os.environ.get("RETENTION_VACUUM_PAGES", 256))  # Free pages released per incremental_vacuum step
+RETENTION_INTERVAL = float(os.environ.get("RETENTION_INTERVAL", 86400))  # Seconds between automatic runs
+
+DAY = 86400
+ALIGN = max(ROLLUP_TABLES.values())  # Raw cutoffs fall on a rollup boundary so no bucket is left half-backed
+
+class RetentionPolicy:
+    """
+    Keeps smartnest.db from growing without bound.
+
+    Raw readings older than `raw_days` are deleted; they are already
+    downsampled into the hourly/daily rollups, which are updated in the
+    same transaction as every insert. Rollups have their own (longer)
+    retention. Deletes run in small batches with a pause in between so
+    the collector never waits long for the write lock, and freed pages
+    are returned to the filesystem with incremental vacuum steps.
+    """
+
+    def __init__(self, raw_days=RAW_RETENTION_DAYS, hourly_days=HOURLY_RETENTION_DAYS,
+                 daily_days=DAILY_RETENTION_DAYS, device_days=DEVICE_RETENTION_DAYS,
+                 delete_batch=DELETE_BATCH, batch_pause=BATCH_PAUSE, vacuum_pages=VACUUM_PAGES,
+                 interval=RETENTION_INTERVAL):
+        self.raw_days = raw_days
+        self.hourly_days = hourly_days
+        self.daily_days = daily_days
+        self.device_days = device_days
+        self.delete_batch = delete_batch
+        self.batch_pause = batch_pause
+        self.vacuum_pages = vacuum_pages
+        self.interval = interval
+        self.last_run = None
+        self.last_report = None
+
+    def cutoffs(self, now=None):
+        """Return {(table, timestamp column): cutoff} for every table with a retention limit."""
+        now = int(now or time.time())
+        cutoffs = {}
+        if self.raw_days:
+            cutoffs[("sensor_data", "timestamp")] = ((now - int(self.raw_days * DAY)) // ALIGN) * ALIGN
+        if self.hourly_days:
+            cutoffs[("sensor_rollup_hourly", "bucket_start")] = now - int(self.hourly_days * DAY)
+        if self.daily_days:
+            cutoffs[("sensor_rollup_daily", "bucket_start")] = now - int(self.daily_days * DAY)
+        if self.device_days:
+            cutoffs[("device_readings", "timestamp")] = now - int(self.device_days * DAY)
+        return cutoffs
+
+    def _delete_before(self, table, column, cutoff, dry_run=False):
+        """Delete rows with `column` < cutoff, DELETE_BATCH rows per transaction. Returns the row count."""
+        if dry_run:
+            return get_connection().execute(f"SELECT COUNT(*) FROM {table} WHERE {column} < ?", (cutoff,)).fetchone()[0]
+        deleted = 0
+        while True:
+            with transaction() as conn:
+                count = conn.execute(
+                    f'''
+                    DELETE FROM {table} WHERE rowid IN (
+                        SELECT rowid FROM {table} WHERE {column} < ? LIMIT ?
+                    )
+                    ''',
+                    (cutoff, self.delete_batch)
+                ).rowcount
+            deleted += count
+            if count < self.delete_batch:
+                return deleted
+            time.sleep(self.batch_pause)
+
+    def _incremental_vacuum(self):
+        """Release free pages in small steps. Returns the number of pages released."""
+        conn = get_connection()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        free_before = free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free:
+            # executescript steps the pragma to completion; execute() would free a single page
+            conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free:
+                time.sleep(self.batch_pause)
+        return free_before
+
+    def run(self, now=None, dry_run=False):
+        """Apply the policy once and return a report of rows deleted, bytes reclaimed and time spent."""
+        started = time.perf_counter()
+        size_before = database_size()
+        conn = get_connection()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+
+        deleted = {}
+        delete_started = time.perf_counter()
+        for (table, column), cutoff in self.cutoffs(now).items():
+            deleted[table] = self._delete_before(table, column, cutoff, dry_run=dry_run)
+        delete_s = time.perf_counter() - delete_started
+
+        vacuum_started = time.perf_counter()
+        released = 0
+        if not dry_run:
+            released = self._incremental_vacuum()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        vacuum_s = time.perf_counter() - vacuum_started
+
+        size_after = database_size()
+        self.last_run = time.monotonic()
+        self.last_report = {
+            "dry_run": dry_run,
+            "deleted_rows": deleted,
+            "pages_released": released,
+            "free_pages": conn.execute("PRAGMA freelist_count").fetchone()[0],
+            "incremental_vacuum": conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2,
+            "bytes_before": size_before,
+            "bytes_after": size_after,
+            "bytes_reclaimed": size_before - size_after,
+            "bytes_releasable": conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+            "delete_seconds": round(delete_s, 3),
+            "vacuum_seconds": round(vacuum_s, 3),
+            "total_seconds": round(time.perf_counter() - started, 3),
+        }
+        return self.last_report
+
+    def run_if_due(self):
+        """Run the policy if `interval` seconds have passed since the last run. Returns the report or None."""
+        if self.last_run is not None and time.monotonic() - self.last_run < self.interval:
+            return None
+        return self.run()
+
+def database_size(db_file=None):
+    """Bytes used on disk by the database file and its WAL."""
+    db_file = db_file or storage.DB_FILE
+    return sum(os.path.getsize(path) for path in (db_file, db_file + "-wal") if os.path.exists(path))
+
+def enable_incremental_vacuum():
+    """
+    Switch an existing database to auto_vacuum=INCREMENTAL. This needs one
+    full VACUUM, which rewrites the file and holds the write lock while it
+    runs, so it is a manual step rather than part of every run.
+    """
+    conn = get_connection()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+# Shared policy run by the data collector
+retention_policy = RetentionPolicy()
+
+if __name__ == "__main__":
+    # Apply the policy now: python -m app.retention [--dry-run] [--enable-incremental-vacuum]
+    import sys
+    from app.models import setup_database
+
+    setup_database()
+    if "--enable-incremental-vacuum" in sys.argv:
+        started = time.perf_counter()
+        enable_incremental_vacuum()
+        print(f"Enabled incremental vacuum in {time.perf_counter() - started:.2f}s")
+    print(json.dumps(retention_policy.run(dry_run="--dry-run" in sys.argv), indent=2))
@@ -0,0 +1,148 @@
+import time
+from app.storage import transaction
+
+# Rollup table -> bucket size in seconds
+ROLLUP_TABLES = {"sensor_rollup_hourly": 3600, "sensor_rollup_daily": 86400}
+ROLLUP_FOR_BUCKET = {"1h": "sensor_rollup_hourly", "1d": "sensor_rollup_daily"}
+
+COLUMNS = (
+    "bucket_start, count, "
+    "temp_sum, temp_min, temp_max, temp_last, "
+    "hum_sum, hum_min, hum_max, hum_last, last_timestamp"
+)
+
+def create_rollup_tables(conn):
+    """Create the rollup tables. Returns True if any of them did not exist yet."""
+    created = False
+    for table in ROLLUP_TABLES:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        if not exists:
+            conn.execute(f'''
+                CREATE TABLE {table} (
+                    bucket_start INTEGER PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    temp_sum REAL NOT NULL,
+                    temp_min REAL NOT NULL,
+                    temp_max REAL NOT NULL,
+                    temp_last REAL NOT NULL,
+                    hum_sum REAL NOT NULL,
+                    hum_min REAL NOT NULL,
+                    hum_max REAL NOT NULL,
+                    hum_last REAL NOT NULL,
+                    last_timestamp INTEGER NOT NULL
+                )
+            ''')
+            created = True
+    return created
+
+def _aggregate(readings, size):
+    """Fold (timestamp, temperature, humidity) readings into per-bucket partial aggregates."""
+    buckets = {}
+    for timestamp, temperature, humidity in readings:
+        start = (timestamp // size) * size
+        agg = buckets.get(start)
+        if agg is None:
+            buckets[start] = [start, 1, temperature, temperature, temperature, temperature,
+                              humidity, humidity, humidity, humidity, timestamp]
+            continue
+        agg[1] += 1
+        agg[2] += temperature
+        agg[3] = min(agg[3], temperature)
+        agg[4] = max(agg[4], temperature)
+        agg[6] += humidity
+        agg[7] = min(agg[7], humidity)
+        agg[8] = max(agg[8], humidity)
+        if timestamp >= agg[10]:
+            agg[5], agg[9], agg[10] = temperature, humidity, timestamp
+    return buckets.values()
+
+def apply_readings(conn, readings):
+    """
+    Merge newly inserted readings into every rollup table. Call inside the
+    same transaction as the insert so raw data and rollups stay consistent.
+    """
+    for table, size in ROLLUP_TABLES.items():
+        conn.executemany(
+            f'''
+            INSERT INTO {table} ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(bucket_start) DO UPDATE SET
+                count = count + excluded.count,
+                temp_sum = temp_sum + excluded.temp_sum,
+                temp_min = MIN(temp_min, excluded.temp_min),
+                temp_max = MAX(temp_max, excluded.temp_max),
+                hum_sum = hum_sum + excluded.hum_sum,
+                hum_min = MIN(hum_min, excluded.hum_min),
+                hum_max = MAX(hum_max, excluded.hum_max),
+                temp_last = CASE WHEN excluded.last_timestamp >= last_timestamp
+                                 THEN excluded.temp_last ELSE temp_last END,
+                hum_last = CASE WHEN excluded.last_timestamp >= last_timestamp
+                                THEN excluded.hum_last ELSE hum_last END,
+                last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+            ''',
+            _aggregate(readings, size)
+        )
+
+def backfill(conn):
+    """
+    Rebuild the rollup tables from the raw sensor_data table. Buckets older
+    than the oldest raw reading are kept: their raw rows were removed by
+    the retention policy and the rollups are all that is left of them.
+    """
+    oldest = conn.execute("SELECT MIN(timestamp) FROM sensor_data").fetchone()[0]
+    if oldest is None:
+        return
+    for table, size in ROLLUP_TABLES.items():
+        conn.execute(f"DELETE FROM {table} WHERE bucket_start >= ?", ((oldest // size) * size,))
+        conn.execute(
+            f'''
+            INSERT INTO {table} ({COLUMNS})
+            SELECT b.bucket_start, b.count,
+                   b.temp_sum, b.temp_min, b.temp_max, last.temperature,
+                   b.hum_sum, b.hum_min, b.hum_max, last.humidity, b.last_timestamp
+            FROM (
+                SELECT (timestamp / ?) * ? AS bucket_start, COUNT(*) AS count,
+                       SUM(temperature) AS temp_sum, MIN(temperature) AS temp_min, MAX(temperature) AS temp_max,
+                       SUM(humidity) AS hum_sum, MIN(humidity) AS hum_min, MAX(humidity) AS hum_max,
+                       MAX(timestamp) AS last_timestamp
+                FROM sensor_data
+                GROUP BY bucket_start
+            ) AS b
+            JOIN sensor_data AS last ON last.id = (
+                SELECT id FROM sensor_data WHERE timestamp = b.last_timestamp ORDER BY id DESC LIMIT 1
+            )
+            ''',
+            (size, size)
+        )
+
+def iter_rollup_buckets(conn, bucket, start, end, limit):
+    """
+    Yield (bucket_start, count, temp min/max/avg, humidity min/max/avg) rows
+    from the rollup table for `bucket` ("1h" or "1d").
+    """
+    table = ROLLUP_FOR_BUCKET[bucket]
+    size = ROLLUP_TABLES[table]
+    return conn.execute(
+        f'''
+        SELECT bucket_start, count,
+               temp_min, temp_max, temp_sum / count,
+               hum_min, hum_max, hum_sum / count
+        FROM {table}
+        WHERE bucket_start >= ? AND bucket_start < ?
+        ORDER BY bucket_start
+        LIMIT ?
+        ''',
+        ((start // size) * size, end, limit)
+    )
+
+if __name__ == "__main__":
+    # Rebuild the rollups from raw data: python -m app.rollups
+    from app.models import setup_database
+
+    setup_database()
+    started = time.perf_counter()
+    with transaction() as conn:
+        backfill(conn)
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ROLLUP_TABLES}
+    print(f"Rebuilt rollups in {time.perf_counter() - started:.2f}s: {counts}")
@@ -0,0 +1,7 @@
+# Blueprints registered by create_app()
+from .auth import auth_bp
+from .api import api_bp
+from .dashboard import dashboard_bp
+
+# List of all blueprints for easier registration
+blueprints = [auth_bp, api_bp, dashboard_bp]
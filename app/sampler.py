@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import threading
+from collections import namedtuple
+from app.sensors import read_sensor
+
+SAMPLE_INTERVAL = float(os.environ.get("SENSOR_SAMPLE_INTERVAL", 5.0))  # Seconds between DHT reads
+MAX_STALENESS = float(os.environ.get("SENSOR_MAX_STALENESS", 30.0))  # Readings older than this are refused
+
+# Immutable snapshot; replaced wholesale so readers never need a lock
+Snapshot = namedtuple("Snapshot", "temperature humidity timestamp taken_at error error_at")
+EMPTY = Snapshot(None, None, None, None, None, None)
+
+class StaleReadingError(RuntimeError):
+    """Raised when no sensor reading is recent enough."""
+
+def write_shared_reading(path, reading):
+    """Atomically replace `path` with `reading`, for samplers following this one."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(reading, f)
+    os.replace(temp_path, path)
+
+def read_shared_reading(path):
+    with open(path) as f:
+        return json.load(f)
+
+class SensorSampler:
+    """
+    Owns the DHT sensor: a single background thread reads it every
+    `interval` seconds and swaps in a new Snapshot. The API, collector and
+    MQTT publisher read the snapshot instead of touching the GPIO bus.
+    """
+
+    def __init__(self, read=read_sensor, interval=SAMPLE_INTERVAL):
+        self.read = read
+        self.interval = interval
+        self.snapshot = EMPTY
+        self.reads = 0
+        self.failures = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()  # Set once the first reading is in
+        self._start_lock = threading.Lock()
+        self._autostart = True  # latest() starts the thread unless stop() was called
+        self._listeners = []
+        self._sensor_read = read
+        self._shared_path = None  # Where share() writes each new reading
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sensor-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._start_lock:
+            if self._thread is None:
+                return
+            self._autostart = False
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def add_listener(self, callback):
+        """Call `callback(reading)` from the sampler thread after every successful read."""
+        self._listeners.append(callback)
+
+    def share(self, path):
+        """Read the sensor in this process and write every new reading to `path`."""
+        self.read = self._sensor_read
+        self._shared_path = path
+
+    def follow(self, path):
+        """
+        Take readings from `path`, written by the process that called
+        share(), instead of reading the sensor. Only one process on a host
+        should own the DHT sensor.
+        """
+        self.read = lambda: read_shared_reading(path)
+        self._shared_path = None
+
+    def sample(self):
+        """Read the sensor once and publish the result."""
+        previous = self.snapshot
+        try:
+            data = self.read()
+        except Exception as e:
+            self.failures += 1
+            self.snapshot = previous._replace(error=str(e), error_at=time.monotonic())
+            print(f"Sensor read failed: {e}")
+            return
+        now = time.time()
+        timestamp = data.get("timestamp", now)  # Followed readings keep the owner's timestamp
+        if timestamp == previous.timestamp:
+            return  # The owner has not taken a new reading since the last poll
+        self.reads += 1
+        taken_at = time.monotonic() - max(0.0, now - timestamp)
+        self.snapshot = Snapshot(data["temperature"], data["humidity"], timestamp, taken_at, None, None)
+        self._ready.set()
+        reading = {"temperature": data["temperature"], "humidity": data["humidity"], "timestamp": timestamp}
+        if self._shared_path:
+            try:
+                write_shared_reading(self._shared_path, reading)
+            except OSError as e:
+                print(f"Error sharing sensor reading: {e}")
+        for callback in self._listeners:
+            try:
+                callback(dict(reading))
+            except Exception as e:
+                print(f"Error in sensor listener: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.sample()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def wait_ready(self, timeout=None):
+        """Block until the first reading is in, for at most `timeout` seconds. Returns True if it is."""
+        return self._ready.wait(timeout)
+
+    def latest(self, max_age=MAX_STALENESS):
+        """
+        Return the most recent reading with its age in seconds. Raises
+        StaleReadingError if there is none younger than `max_age`
+        (pass None to accept any age).
+        """
+        if self._thread is None and self._autostart:
+            self.start()
+        snapshot = self.snapshot
+        if snapshot.taken_at is None:
+            raise StaleReadingError(snapshot.error or "No sensor reading yet")
+        age = time.monotonic() - snapshot.taken_at
+        if max_age is not None and age > max_age:
+            raise StaleReadingError(f"Latest sensor reading is {age:.0f}s old: {snapshot.error or 'no new data'}")
+        return {
+            "temperature": snapshot.temperature,
+            "humidity": snapshot.humidity,
+            "timestamp": snapshot.timestamp,
+            "age": round(age, 3),
+            "error": snapshot.error,
+        }
+
+# Shared sampler for the API, collector and MQTT publisher
+sensor_sampler = SensorSampler()
@@ -1,42 +1,32 @@
-import os
-import platform
-import random
 import time
+from app import hardware, metrics
 
-# Mock or Real DHT Sensor Setup
-if platform.system() == "Windows" or os.environ.get("VERCEL"):
-    # Mock DHT Sensor for development
-    class MockDHT:
-        def __init__(self):
-            self._temperature = 25.0
-            self._humidity = 50.0
+DHT_PIN = 4  # GPIO pin for the DHT11
 
-        @property
-        def temperature(self):
-            self._temperature += random.uniform(-0.5, 0.5)
-            return round(self._temperature, 1)
+SENSOR_READ_SECONDS = metrics.histogram("smartnest_sensor_read_seconds", "Time to read the DHT sensor, including retries.")
+SENSOR_RETRIES = metrics.counter("smartnest_sensor_read_retries_total", "DHT reads retried after a RuntimeError.")
+SENSOR_FAILURES = metrics.counter("smartnest_sensor_read_failures_total", "DHT reads that failed after every retry.")
 
-        @property
-        def humidity(self):
-            self._humidity += random.uniform(-1, 1)
-            self._humidity = max(0, min(100, self._humidity))
-            return round(self._humidity, 1)
+_dht_sensor = None
 
-    dht_sensor = MockDHT()
-else:
-    # Real DHT Sensor
-    import adafruit_dht
-    import board
-
-    dht_sensor = adafruit_dht.DHT11(board.D4)  # GPIO 4
+def get_dht_sensor():
+    """Return the DHT sensor, creating it on the selected hardware backend on first use."""
+    global _dht_sensor
+    if _dht_sensor is None:
+        _dht_sensor = hardware.create("dht", DHT_PIN)
+    return _dht_sensor
 
+@metrics.timed(SENSOR_READ_SECONDS)
 def read_sensor():
+    dht_sensor = get_dht_sensor()
     for _ in range(3):  # Retry up to 3 times
         try:
             temperature = dht_sensor.temperature
             humidity = dht_sensor.humidity
             return {"temperature": temperature, "humidity": humidity}
         except RuntimeError as e:
+            SENSOR_RETRIES.inc()
             print(f"Retrying sensor read: {e}")
             time.sleep(2)
+    SENSOR_FAILURES.inc()
     raise RuntimeError("Failed to read sensor after retries.")
@@ -0,0 +1,274 @@
+import os
+import sys
+import atexit
+import signal
+import threading
+from app import hardware, metrics
+from app.storage import DB_FILE
+
+SERVICES = os.environ.get("SERVICES", "collector")  # Background services web workers may run ("collector", "automation"); empty for none
+LOCK_PREFIX = os.environ.get("SERVICES_LOCK_PREFIX", DB_FILE)  # Lock files are <prefix>.<service>.lock, one owner per host
+SHARED_READING = os.environ.get("SHARED_READING", DB_FILE + ".reading.json")  # Latest reading, written by the collector's owner
+TAKEOVER_INTERVAL = float(os.environ.get("SERVICES_TAKEOVER_INTERVAL", 10.0))  # Seconds between attempts to replace an owner that exited
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class HostLock:
+    """
+    A non-blocking exclusive lock on a file. The operating system drops it
+    when the holding process exits, however it exits, so a crashed owner
+    never leaves a stale lock behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self):
+        """Take the lock if no other process holds it. Returns True if this process holds it."""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())  # For humans; the lock itself is what counts
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+class Collector:
+    """Owns the DHT sensor, the batched DB writer and MQTT, and stores a reading every COLLECT_INTERVAL."""
+
+    def __init__(self, shared_reading=SHARED_READING):
+        self.shared_reading = shared_reading
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        from app.data_collector import collect
+        from app.ingest import ingest_queue
+        from app.mqtt_client import mqtt_client
+        from app.sampler import sensor_sampler
+
+        if metrics.METRICS_PORT:
+            # Web workers each have their own registry; only this process has the collector's series
+            try:
+                metrics.start_http_server()
+            except OSError as e:
+                print(f"Error serving metrics on port {metrics.METRICS_PORT}: {e}")
+        ingest_queue.start()  # Batched DB writes; pending readings are flushed by stop()
+        mqtt_client.start()  # Background network loop with automatic reconnect
+        sensor_sampler.share(self.shared_reading)  # Other processes follow this one's readings
+        sensor_sampler.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=collect, args=(self._stop,), name="collector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        from app.ingest import ingest_queue
+        from app.mqtt_client import mqtt_client
+        from app.sampler import sensor_sampler
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        sensor_sampler.stop()
+        mqtt_client.stop()  # Sends what is still queued
+        ingest_queue.stop()  # Writes buffered readings
+        print("Ingest stats:", ingest_queue.stats())
+
+class Automation:
+    """Runs the automation rules on PIR motion edges and sensor readings."""
+
+    def __init__(self):
+        self.engine = None
+
+    def start(self):
+        from app.automation import create_engine
+        from app.sampler import sensor_sampler
+        from app.sensors import DHT_PIN
+        from app.utils import MOTION_SENSOR_PIN
+
+        if MOTION_SENSOR_PIN == DHT_PIN and hardware.backend() == "real":
+            raise ValueError(f"MOTION_SENSOR_PIN and the DHT sensor both use GPIO {DHT_PIN}; set MOTION_SENSOR_PIN")
+        self.engine = create_engine()
+        self.engine.attach_motion_sensor(hardware.create("motion_sensor", MOTION_SENSOR_PIN))
+        self.engine.start()
+        sensor_sampler.start()  # Owned or followed, readings reach the rules either way
+
+    def stop(self):
+        if self.engine is not None:
+            self.engine.stop()
+            print("Automation stats:", self.engine.stats())
+            self.engine = None
+
+# Service name -> factory
+REGISTRY = {"collector": Collector, "automation": Automation}
+
+class BackgroundServices:
+    """
+    Starts each background service in exactly one process per host.
+
+    Every web worker calls start(). For each service, the worker that takes
+    its HostLock runs it; the others retry every TAKEOVER_INTERVAL seconds
+    and take over if the owner exits. Workers that do not own the collector
+    serve sensor readings from SHARED_READING instead of opening the DHT
+    sensor themselves. stop() (also run at exit) stops owned services and
+    flushes their buffers.
+    """
+
+    def __init__(self, names=None, lock_prefix=LOCK_PREFIX, shared_reading=SHARED_READING,
+                 takeover_interval=TAKEOVER_INTERVAL):
+        if names is None:
+            names = [name.strip() for name in SERVICES.split(",") if name.strip()]
+        for name in names:
+            if name not in REGISTRY:
+                raise ValueError(f"Unknown background service '{name}'")
+        self.names = tuple(names)
+        self.shared_reading = shared_reading
+        self.takeover_interval = takeover_interval
+        self.locks = {name: HostLock(f"{lock_prefix}.{name}.lock") for name in self.names}
+        self.running = {}  # name -> started service
+        self.failed = {}  # name -> error; a service that fails to start is not retried
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def start(self):
+        """Claim whichever services no other process runs yet. Safe to call repeatedly."""
+        from app.sampler import sensor_sampler
+
+        with self._lock:
+            if self._watcher is not None or self._stop.is_set():
+                return
+            if "collector" not in self.names or not self._try_claim("collector"):
+                sensor_sampler.follow(self.shared_reading)
+            atexit.register(self.stop)
+            if not self._claim_all():
+                self._watcher = threading.Thread(target=self._watch, name="services-takeover", daemon=True)
+                self._watcher.start()
+            else:
+                self._watcher = False  # Everything is owned here; nothing to watch
+
+    def _claim(self, name):
+        if name in self.running:
+            return True
+        if not self.locks[name].acquire():
+            return False
+        if name == "collector":
+            service = REGISTRY[name](self.shared_reading)
+        else:
+            service = REGISTRY[name]()
+        try:
+            service.start()
+        except Exception:
+            self.locks[name].release()
+            raise
+        self.running[name] = service
+        print(f"Started background service '{name}' in process {os.getpid()}")
+        return True
+
+    def _try_claim(self, name):
+        """Claim `name`, recording (not raising) a failure to start it. Returns True if this process runs it."""
+        if name in self.failed:
+            return False
+        try:
+            return self._claim(name)
+        except Exception as e:
+            print(f"Error starting background service '{name}': {e}")
+            self.failed[name] = str(e)
+            return False
+
+    def _claim_all(self):
+        """Try every service not yet running. Returns True once nothing is left to wait for."""
+        for name in self.names:
+            self._try_claim(name)
+        return all(name in self.running or name in self.failed for name in self.names)
+
+    def _watch(self):
+        while not self._stop.wait(self.takeover_interval):
+            with self._lock:
+                if self._stop.is_set() or self._claim_all():
+                    return
+
+    def stop(self):
+        """Stop owned services in reverse start order, flushing buffered data, and release their locks."""
+        self._stop.set()
+        with self._lock:
+            for name, service in reversed(list(self.running.items())):
+                try:
+                    service.stop()
+                except Exception as e:
+                    print(f"Error stopping background service '{name}': {e}")
+                self.locks[name].release()
+                print(f"Stopped background service '{name}'")
+            self.running.clear()
+        hardware.close_all()
+
+    def stats(self):
+        return {
+            "pid": os.getpid(),
+            "owned": list(self.running),
+            "followed": [name for name in self.names if name not in self.running and name not in self.failed],
+            "failed": dict(self.failed),
+        }
+
+# Shared by the WSGI entry point and the standalone collector/automation processes
+background_services = BackgroundServices()
+
+def run_forever(names):
+    """
+    Run `names` in this process until Ctrl+C or SIGTERM, then stop them
+    gracefully. Exits early if another process already runs all of them,
+    and with status 1 if any of them fails to start.
+    """
+    if metrics.METRICS_PORT:
+        metrics.start_http_server()  # No Flask in this process; expose /metrics on its own port
+
+    services = BackgroundServices(names)
+    services.start()
+    if services.failed:
+        for name, error in services.failed.items():
+            print(f"Could not start '{name}': {error}")
+        services.stop()
+        sys.exit(1)
+    if not services.running:
+        print(f"Already running in another process: {', '.join(names)}")
+        services.stop()
+        return
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    try:
+        while not stopped.wait(1.0):  # Short waits keep Ctrl+C responsive on Windows
+            pass
+    except KeyboardInterrupt:
+        print("Stopped by user")
+    finally:
+        services.stop()
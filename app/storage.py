@@ -0,0 +1,90 @@
+import sqlite3
+import os
+import threading
+from contextlib import contextmanager
+
+DB_FILE = os.environ.get("DB_FILE", "smartnest.db")
+BUSY_TIMEOUT = float(os.environ.get("DB_BUSY_TIMEOUT", 5.0))  # Seconds to wait on a locked database
+STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE", 128))  # Prepared statements kept per connection
+
+_local = threading.local()
+_pool = {}  # (thread id, db file) -> connection, so close_all() can reach every thread
+_pool_lock = threading.Lock()
+_generation = 0  # Bumped by close_all() so other threads drop their closed connections
+
+def _connect(db_file):
+    """Open a connection configured for concurrent readers and a single writer."""
+    conn = sqlite3.connect(
+        db_file,
+        timeout=BUSY_TIMEOUT,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    # Lets the retention policy free pages in small steps; only takes effect before the file's first write
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    if db_file != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}")
+    return conn
+
+def _prune_dead_threads():
+    """Close connections owned by threads that have exited."""
+    alive = {thread.ident for thread in threading.enumerate()}
+    for key in [key for key in _pool if key[0] not in alive]:
+        _pool.pop(key).close()
+
+def get_connection(db_file=None):
+    """
+    Return this thread's connection to `db_file`, opening it on first use.
+    Connections are reused for the lifetime of the thread, so sqlite3's
+    statement cache keeps queries prepared between calls.
+    """
+    db_file = db_file or DB_FILE
+    connections = getattr(_local, "connections", None)
+    if connections is None or _local.generation != _generation:
+        connections = _local.connections = {}
+        _local.generation = _generation
+
+    conn = connections.get(db_file)
+    if conn is None:
+        conn = _connect(db_file)
+        connections[db_file] = conn
+        with _pool_lock:
+            _prune_dead_threads()
+            _pool[(threading.get_ident(), db_file)] = conn
+    return conn
+
+@contextmanager
+def transaction(db_file=None):
+    """Run a block in a single transaction, committing on success and rolling back on error."""
+    conn = get_connection(db_file)
+    with conn:
+        yield conn
+
+def execute(sql, params=(), db_file=None):
+    """Execute a single write statement and commit it."""
+    with transaction(db_file) as conn:
+        return conn.execute(sql, params)
+
+def executemany(sql, seq_of_params, db_file=None):
+    """Execute a statement for every parameter tuple in one transaction."""
+    with transaction(db_file) as conn:
+        return conn.executemany(sql, seq_of_params)
+
+def query_all(sql, params=(), db_file=None):
+    """Run a read query and return all rows."""
+    return get_connection(db_file).execute(sql, params).fetchall()
+
+def query_one(sql, params=(), db_file=None):
+    """Run a read query and return the first row, or None."""
+    return get_connection(db_file).execute(sql, params).fetchone()
+
+def close_all():
+    """Close every pooled connection, e.g. on shutdown or after changing DB_FILE."""
+    global _generation
+    with _pool_lock:
+        for conn in _pool.values():
+            conn.close()
+        _pool.clear()
+        _generation += 1
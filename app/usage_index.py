@@ -0,0 +1,139 @@
+import os
+import json
+import threading
+from datetime import datetime
+from app.storage import transaction
+from app.usage_store import SUFFIX as USAGE_SUFFIX, day_total
+
+DATA_DIR = os.environ.get("DATA_DIR", "data")
+
+_lock = threading.Lock()
+_cache = {}  # data dir -> {filename: (mtime_ns, size, date, usage)}
+
+def _setup(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS usage_index (
+            data_dir TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            usage NUMERIC,
+            PRIMARY KEY (data_dir, filename)
+        )
+    ''')
+
+def _load(data_dir):
+    """Load the persisted index for `data_dir` into memory."""
+    with transaction() as conn:
+        _setup(conn)
+        rows = conn.execute(
+            "SELECT filename, mtime_ns, size, date, usage FROM usage_index WHERE data_dir = ?",
+            (data_dir,)
+        ).fetchall()
+    return {row[0]: row[1:] for row in rows}
+
+def _parse_day_file(path):
+    """
+    Sum the "usage" values in one daily file, reading columnar files
+    through the streaming reader. Returns None if the file is unusable.
+    """
+    if path.endswith(USAGE_SUFFIX):
+        try:
+            return day_total(path)
+        except (OSError, ValueError) as e:
+            print(f"Error processing file {os.path.basename(path)}: {e}")
+            return None
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error processing file {os.path.basename(path)}: {e}")
+        return None
+    if not isinstance(data, list):  # Ensure data is in list format
+        return None
+    return sum(item.get("usage", 0) for item in data)
+
+def daily_usage(data_dir=None):
+    """
+    Return {"YYYY-MM-DD": usage} for every daily usage file in `data_dir`.
+    Files are only re-parsed when their mtime or size changed since the
+    last call, so unchanged history costs one stat per file. When a day
+    has both a JSON and a columnar file, the columnar one wins.
+    """
+    data_dir = data_dir or DATA_DIR
+    if not os.path.isdir(data_dir):
+        return {}
+    with _lock:
+        index = _cache.get(data_dir)
+        if index is None:
+            index = _cache[data_dir] = _load(data_dir)
+
+        changed, seen = [], set()
+        for entry in os.scandir(data_dir):
+            suffix = ".json" if entry.name.endswith(".json") else USAGE_SUFFIX
+            if not entry.name.endswith(suffix) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            cached = index.get(entry.name)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                seen.add(entry.name)
+                continue
+
+            date = entry.name[:-len(suffix)]
+            try:
+                datetime.strptime(date, "%Y-%m-%d")
+            except ValueError:
+                continue  # Not a daily usage file (e.g. offline_data.json)
+            seen.add(entry.name)
+            index[entry.name] = (stat.st_mtime_ns, stat.st_size, date, _parse_day_file(entry.path))
+            changed.append((data_dir, entry.name) + index[entry.name])
+
+        removed = [(data_dir, name) for name in index if name not in seen]
+        for _, name in removed:
+            del index[name]
+
+        if changed or removed:
+            with transaction() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO usage_index (data_dir, filename, mtime_ns, size, date, usage) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    changed
+                )
+                conn.executemany("DELETE FROM usage_index WHERE data_dir = ? AND filename = ?", removed)
+
+        # A day can have both files; the columnar one wins unless the JSON was rewritten after it,
+        # the same rule usage_store.convert_data_dir() uses
+        chosen = {}  # date -> (mtime_ns, is columnar, usage)
+        for filename, (mtime_ns, _, date, usage) in index.items():
+            if usage is None:
+                continue
+            columnar = filename.endswith(USAGE_SUFFIX)
+            if date in chosen:
+                other_mtime_ns, _, _ = chosen[date]
+                usage_mtime_ns, json_mtime_ns = (mtime_ns, other_mtime_ns) if columnar else (other_mtime_ns, mtime_ns)
+                if columnar != (usage_mtime_ns >= json_mtime_ns):
+                    continue
+            chosen[date] = (mtime_ns, columnar, usage)
+        return {date: usage for date, (_, _, usage) in chosen.items()}
+
+def clear_cache():
+    """Forget the in-memory copy so the next call reloads the persisted index."""
+    with _lock:
+        _cache.clear()
+
+def usage_version(data_dir=None):
+    """
+    Return a fingerprint of the daily usage files in `data_dir` (names,
+    mtimes and sizes). It changes when a day file is added, removed or
+    rewritten, without parsing anything.
+    """
+    data_dir = data_dir or DATA_DIR
+    if not os.path.isdir(data_dir):
+        return ()
+    signature = []
+    for entry in os.scandir(data_dir):
+        if entry.name.endswith((".json", USAGE_SUFFIX)) and entry.is_file():
+            stat = entry.stat()
+            signature.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(signature))
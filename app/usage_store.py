@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import mmap
+import struct
+from array import array
+from datetime import datetime
+
+DATA_DIR = os.environ.get("DATA_DIR", "data")
+
+# Columnar day file: header, then every timestamp (int64 epoch seconds),
+# then every usage value (float64), all little-endian.
+SUFFIX = ".usage"
+MAGIC = b"SNU1"
+HEADER = struct.Struct("<4sI")  # magic, record count
+
+def _column(buffer, typecode, offset, count):
+    """Copy one column out of the file buffer into a typed array."""
+    column = array(typecode)
+    column.frombytes(buffer[offset:offset + count * column.itemsize])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+def write_day_file(path, timestamps, usages):
+    """Write a columnar day file atomically from parallel sequences of epoch seconds and usage values."""
+    timestamps = array("q", timestamps)
+    usages = array("d", usages)
+    if len(timestamps) != len(usages):
+        raise ValueError("timestamps and usages must have the same length")
+    if sys.byteorder == "big":
+        timestamps.byteswap()
+        usages.byteswap()
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(usages)))
+        timestamps.tofile(f)
+        usages.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def read_columns(path, usage_only=False):
+    """
+    Memory-map a columnar day file and return (timestamps, usages) as
+    arrays. With `usage_only` the timestamp column is never copied.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError(f"{path} is too short to be a usage file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            magic, count = HEADER.unpack_from(buffer)
+            if magic != MAGIC or size != HEADER.size + count * 16:
+                raise ValueError(f"{path} is not a valid usage file")
+            usages = _column(buffer, "d", HEADER.size + count * 8, count)
+            timestamps = None if usage_only else _column(buffer, "q", HEADER.size, count)
+    return timestamps, usages
+
+def iter_records(path):
+    """Stream (epoch seconds, usage) tuples from a columnar day file."""
+    timestamps, usages = read_columns(path)
+    return zip(timestamps, usages)
+
+def day_total(path):
+    """Sum the usage column of a columnar day file."""
+    _, usages = read_columns(path, usage_only=True)
+    total = sum(usages)
+    return int(total) if total.is_integer() else total  # Keep whole kWh values displaying as before
+
+def convert_json_file(json_path, remove_json=False):
+    """Convert one YYYY-MM-DD.json usage file to the columnar format. Returns the new path."""
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError(f"{json_path} does not contain a list of readings")
+
+    timestamps = array("q", (int(datetime.fromisoformat(item["timestamp"]).timestamp()) for item in data))
+    usages = array("d", (item.get("usage", 0) for item in data))
+    usage_path = json_path[:-len(".json")] + SUFFIX
+    write_day_file(usage_path, timestamps, usages)
+    if remove_json:
+        os.remove(json_path)
+    return usage_path
+
+def convert_data_dir(data_dir=None, remove_json=False):
+    """Convert every daily JSON file in `data_dir` that has no columnar copy yet."""
+    data_dir = data_dir or DATA_DIR
+    converted = 0
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            datetime.strptime(filename[:-len(".json")], "%Y-%m-%d")
+        except ValueError:
+            continue  # Not a daily usage file
+        json_path = os.path.join(data_dir, filename)
+        usage_path = json_path[:-len(".json")] + SUFFIX
+        if os.path.exists(usage_path) and os.path.getmtime(usage_path) >= os.path.getmtime(json_path):
+            continue
+        try:
+            convert_json_file(json_path, remove_json=remove_json)
+            converted += 1
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            print(f"Error converting file {filename}: {e}")
+    return converted
+
+if __name__ == "__main__":
+    # Convert existing JSON day files: python -m app.usage_store [data_dir] [--remove-json]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = convert_data_dir(args[0] if args else None, remove_json="--remove-json" in sys.argv)
+    print(f"Converted {count} daily usage files")
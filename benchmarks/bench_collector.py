@@ -0,0 +1,52 @@
+# This script compares the fixed and adaptive collector modes on a simulated day of readings:
+# a steady night, a heating ramp in the morning, a window opened at noon and slow drift in the
+# evening, with sensor noise. It reports readings stored/published, checks made, and how
+# quickly the adaptive mode caught the ramp, for a few deadband settings.
+# No sensor, database or broker is used; time is simulated.
+# Run from the project root: python -m benchmarks.bench_collector
+import math
+import os
+import random
+
+DAY = 86400
+INTERVAL = float(os.environ.get("COLLECT_INTERVAL", 60.0))
+MIN_INTERVAL = float(os.environ.get("COLLECT_MIN_INTERVAL", 5.0))
+HEARTBEAT = float(os.environ.get("COLLECT_HEARTBEAT", 900.0))
+DEADBAND_SETTINGS = [(0.1, 0.5), (0.3, 1.0), (0.5, 2.0)]  # (°C, % RH)
+
+def simulated_reading(t, rng):
+    temperature = 19.0 + 0.5 * math.sin(2 * math.pi * t / DAY)
+    if 7 * 3600 <= t < 8 * 3600:
+        temperature += 3.0 * (t - 7 * 3600) / 3600  # Heating ramp
+    elif t >= 8 * 3600:
+        temperature += 3.0
+    if 12 * 3600 <= t < 12 * 3600 + 900:
+        temperature -= 4.0 * math.sin(math.pi * (t - 12 * 3600) / 900)  # Window opened for 15 minutes
+    humidity = 50.0 + 5.0 * math.sin(2 * math.pi * t / DAY + 1.0)
+    return {"temperature": round(temperature + rng.gauss(0, 0.03), 1),
+            "humidity": round(humidity + rng.gauss(0, 0.2), 1)}
+
+def main():
+    # Imported here so the module's environment defaults are read after the constants above
+    from app.data_collector import AdaptiveCollector
+
+    print(f"Fixed mode: {int(DAY // INTERVAL)} readings stored and published per day")
+    print(f"{'deadband':<18}{'sent':>6}{'checks':>8}{'heartbeats':>12}{'saved':>8}{'min interval':>14}")
+    for temperature_band, humidity_band in DEADBAND_SETTINGS:
+        rng = random.Random(1)
+        clock = {"t": 0.0}
+        collector = AdaptiveCollector({"temperature": temperature_band, "humidity": humidity_band}, HEARTBEAT,
+                                      MIN_INTERVAL, INTERVAL, read=lambda: simulated_reading(clock["t"], rng),
+                                      send=lambda reading: None)
+        shortest = INTERVAL
+        while clock["t"] < DAY:
+            wait = collector.step(now=clock["t"])
+            shortest = min(shortest, wait)
+            clock["t"] += wait
+        stats = collector.stats(now=clock["t"])
+        label = f"{temperature_band}°C / {humidity_band}%"
+        print(f"{label:<18}{stats['sent']:>6}{stats['checks']:>8}{stats['heartbeats']:>12}"
+              f"{stats['writes_saved_pct']:>7.1f}%{shortest:>13.0f}s")
+
+if __name__ == "__main__":
+    main()
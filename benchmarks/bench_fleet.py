@@ -0,0 +1,92 @@
+# This script measures fleet ingestion: NODES simulated publishers send readings on
+# smartnest/<node>/sensor through the stub broker to a FleetSubscriber writing to a
+# throwaway database, then compares batched device_readings writes with one insert per row.
+# Run from the project root: python -m benchmarks.bench_fleet
+import json
+import os
+import tempfile
+import time
+from app import storage
+from app.devices import save_device_readings_batch
+from app.fleet import FleetSubscriber
+from app.models import setup_database
+from app.mqtt_service import MQTTService
+from benchmarks.stub_broker import StubBroker
+
+NODES = int(os.environ.get("BENCH_NODES", 20))
+MESSAGES = int(os.environ.get("BENCH_MESSAGES", 1000))  # Per node
+ROWS = int(os.environ.get("BENCH_ROWS", 20000))
+
+def wait_for(condition, timeout=120.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Benchmark timed out")
+        time.sleep(0.01)
+
+def count_rows():
+    return storage.query_one("SELECT COUNT(*) FROM device_readings")[0]
+
+def bench_subscriber():
+    broker = StubBroker().start()
+    subscriber = FleetSubscriber(service=MQTTService(broker="127.0.0.1", port=broker.port, client_id="bench-fleet"),
+                                 qos=0)
+    subscriber.start()
+    publisher = MQTTService(broker="127.0.0.1", port=broker.port, client_id="bench-nodes",
+                            queue_size=NODES * MESSAGES)
+    publisher.start()
+    wait_for(lambda: subscriber.service.is_connected() and publisher.is_connected())
+
+    total = NODES * MESSAGES
+    now = int(time.time())
+    start = time.perf_counter()
+    for i in range(MESSAGES):
+        for node in range(NODES):
+            payload = json.dumps({"timestamp": now + i, "temperature": 20.0 + node, "humidity": 50.0})
+            publisher.publish_async(f"smartnest/node{node}/sensor", payload)
+    wait_for(lambda: subscriber.readings + subscriber.dropped >= total)
+    subscriber.ingest.flush()
+    elapsed = time.perf_counter() - start
+    stats = subscriber.ingest.stats()
+
+    publisher.stop()
+    subscriber.stop()
+    broker.stop()
+    return total, elapsed, stats, subscriber.dropped
+
+def bench_writes():
+    rows = [(f"node{i % NODES}", 1700000000 + i, 21.5, 48.0) for i in range(ROWS)]
+    storage.execute("DELETE FROM device_readings")
+
+    start = time.perf_counter()
+    for row in rows[:ROWS // 10]:  # Per-row is slow; time a tenth and scale
+        save_device_readings_batch([row])
+    per_row = (time.perf_counter() - start) * 10
+
+    start = time.perf_counter()
+    for i in range(0, ROWS, 500):
+        save_device_readings_batch(rows[i:i + 500])
+    batched = time.perf_counter() - start
+    return per_row, batched
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        storage.DB_FILE = os.path.join(workdir, "fleet.db")
+        setup_database()
+
+        total, elapsed, stats, dropped = bench_subscriber()
+        print(f"{NODES} nodes x {MESSAGES} messages through the stub broker")
+        print(f"{'ingested':<28}{total / elapsed:>10.0f} readings/s")
+        print(f"{'rows stored':<28}{count_rows():>10}")
+        print(f"{'dropped':<28}{dropped:>10}")
+        print(f"{'batches':<28}{stats['batches']:>10}")
+        print(f"{'avg batch write':<28}{stats['avg_flush_ms']:>10.2f} ms")
+
+        per_row, batched = bench_writes()
+        print(f"{ROWS} device readings written directly")
+        print(f"{'one transaction per row':<28}{ROWS / per_row:>10.0f} rows/s")
+        print(f"{'batches of 500':<28}{ROWS / batched:>10.0f} rows/s")
+        storage.close_all()
+
+if __name__ == "__main__":
+    main()
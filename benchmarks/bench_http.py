@@ -0,0 +1,69 @@
+# This script measures the HTTP caching layer: requests/second and bytes sent for
+# /stats, /plots and /api/sensor-data with caching and compression off, with gzip only,
+# with the response cache, and for browsers revalidating with If-None-Match.
+# It runs the app in-process on the mock hardware against a throwaway database and DATA_DIR.
+# Run from the project root: python -m benchmarks.bench_http
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+DAYS = int(os.environ.get("BENCH_DAYS", 365))  # Synthetic daily usage files
+READINGS = int(os.environ.get("BENCH_READINGS", 20000))
+DURATION = float(os.environ.get("BENCH_DURATION", 2.0))  # Seconds per route and mode
+ROUTES = ("/stats", "/plots", "/api/sensor-data?limit=1000")
+
+def make_data_dir(path):
+    start = time.time() - DAYS * 86400
+    for day in range(DAYS):
+        date = time.strftime("%Y-%m-%d", time.localtime(start + day * 86400))
+        with open(os.path.join(path, f"{date}.json"), "w") as f:
+            json.dump([{"timestamp": f"{date}T{hour:02d}:00:00", "usage": 0.4} for hour in range(24)], f)
+
+def measure(client, route, headers):
+    requests, sent = 0, 0
+    deadline = time.perf_counter() + DURATION
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        response = client.get(route, headers=headers)
+        sent += len(response.get_data())
+        requests += 1
+    return requests / (time.perf_counter() - start), sent / requests
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = os.path.join(workdir, "data")
+        os.makedirs(data_dir)
+        make_data_dir(data_dir)
+        os.environ.update(DB_FILE=os.path.join(workdir, "http.db"), DATA_DIR=data_dir, HARDWARE="mock")
+
+        # Imported after the environment is set so DB_FILE and DATA_DIR take effect
+        from app import create_app, http_cache
+        from app.models import save_sensor_data_batch
+
+        app = create_app()
+        app.config["LOGIN_DISABLED"] = True
+        now = int(time.time())
+        with contextlib.redirect_stdout(io.StringIO()):
+            save_sensor_data_batch([(now - READINGS * 60 + i * 60, 21.0 + i % 7 * 0.1, 48.0) for i in range(READINGS)])
+        client = app.test_client()
+
+        modes = [
+            ("no cache, identity", False, False, {}),
+            ("no cache, gzip", False, True, {"Accept-Encoding": "gzip"}),
+            ("cache, gzip", True, True, {"Accept-Encoding": "gzip"}),
+        ]
+        print(f"{'route':<30}{'mode':<22}{'req/s':>10}{'bytes/req':>12}")
+        for route in ROUTES:
+            for name, cache, compress, headers in modes:
+                http_cache.HTTP_CACHE, http_cache.HTTP_COMPRESS = cache, compress
+                rate, size = measure(client, route, headers)
+                print(f"{route:<30}{name:<22}{rate:>10.0f}{size:>12.0f}")
+            etag = client.get(route).headers["ETag"]
+            rate, size = measure(client, route, {"If-None-Match": etag})
+            print(f"{route:<30}{'cache, revalidate 304':<22}{rate:>10.0f}{size:>12.0f}")
+
+if __name__ == "__main__":
+    main()
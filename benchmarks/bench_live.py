@@ -0,0 +1,62 @@
+# This script measures the live telemetry fan-out with many concurrent subscribers.
+# Fast subscribers drain their queues continuously; slow ones stall so their bounded
+# buffers overflow. It reports producer cost per event, delivery latency to fast
+# subscribers, and how many slow subscribers were dropped.
+# Run from the project root: python -m benchmarks.bench_live
+import os
+import queue
+import threading
+import time
+from app.live import Broadcaster
+
+FAST_SUBSCRIBERS = int(os.environ.get("BENCH_FAST_SUBSCRIBERS", 200))
+SLOW_SUBSCRIBERS = int(os.environ.get("BENCH_SLOW_SUBSCRIBERS", 20))
+EVENTS = int(os.environ.get("BENCH_EVENTS", 500))
+
+def main():
+    broadcaster = Broadcaster(buffer_size=32)
+    latencies = []
+    latencies_lock = threading.Lock()
+    done = threading.Event()
+
+    def fast_consumer(subscriber):
+        local = []
+        while not done.is_set() or not subscriber.queue.empty():
+            try:
+                frame = subscriber.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            sent_at = float(frame.split('"sent_at": ')[1].split("}")[0])
+            local.append(time.perf_counter() - sent_at)
+        with latencies_lock:
+            latencies.extend(local)
+
+    fast = [broadcaster.subscribe() for _ in range(FAST_SUBSCRIBERS)]
+    slow = [broadcaster.subscribe() for _ in range(SLOW_SUBSCRIBERS)]  # Never read
+    threads = [threading.Thread(target=fast_consumer, args=(subscriber,)) for subscriber in fast]
+    for thread in threads:
+        thread.start()
+
+    publish_time = 0.0
+    for i in range(EVENTS):
+        start = time.perf_counter()
+        broadcaster.publish("reading", {"temperature": 21.0, "humidity": 45.0, "sent_at": start})
+        publish_time += time.perf_counter() - start
+        time.sleep(0.001)  # Give consumers a chance to run, as with a real sampling interval
+
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    stats = broadcaster.stats()
+    print(f"{FAST_SUBSCRIBERS} fast + {SLOW_SUBSCRIBERS} stalled subscribers, {EVENTS} events")
+    print(f"{'producer time per event':<28}{publish_time / EVENTS * 1e6:>10.1f} us")
+    print(f"{'delivered frames':<28}{len(latencies):>10}")
+    print(f"{'latency p50':<28}{latencies[len(latencies) // 2] * 1000:>10.2f} ms")
+    print(f"{'latency p99':<28}{latencies[int(len(latencies) * 0.99)] * 1000:>10.2f} ms")
+    print(f"{'stalled clients dropped':<28}{stats['dropped_clients']:>10}")
+    print(f"{'clients still connected':<28}{stats['clients']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# This script load-tests login password verification.
+# A burst of concurrent login attempts runs against the verifier while a "real-time"
+# thread repeatedly does a small unit of API work; it compares an unbounded verifier
+# (one worker per attacker) with the bounded pool, then shows the token bucket limiter.
+# Run from the project root: python -m benchmarks.bench_login
+import os
+import threading
+import time
+from werkzeug.security import generate_password_hash
+from app.auth_throttle import PasswordVerifier, TokenBucketLimiter, AuthBusyError
+
+ATTACKERS = int(os.environ.get("BENCH_ATTACKERS", 32))
+DURATION = float(os.environ.get("BENCH_DURATION", 5.0))
+
+def api_work():
+    """Stand-in for serving /api/sensor: a little CPU work per request."""
+    return sum(i * i for i in range(5000))
+
+def run(verifier, stored_hash):
+    stop = threading.Event()
+    counts = {"ok": 0, "busy": 0}
+    counts_lock = threading.Lock()
+    latencies = []
+
+    def attacker():
+        while not stop.is_set():
+            try:
+                verifier.verify(stored_hash, "wrong-password")
+                key = "ok"
+            except AuthBusyError:
+                key = "busy"
+                time.sleep(0.01)
+            with counts_lock:
+                counts[key] += 1
+
+    def realtime():
+        while not stop.is_set():
+            start = time.perf_counter()
+            api_work()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=attacker) for _ in range(ATTACKERS)]
+    threads.append(threading.Thread(target=realtime))
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "verifications_per_sec": counts["ok"] / DURATION,
+        "refused": counts["busy"],
+        "api_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "api_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+def main():
+    stored_hash = generate_password_hash("correct-password", method="pbkdf2:sha256")
+
+    baseline = []
+    for _ in range(200):
+        start = time.perf_counter()
+        api_work()
+        baseline.append(time.perf_counter() - start)
+    baseline.sort()
+
+    unbounded = run(PasswordVerifier(workers=ATTACKERS, max_pending=ATTACKERS * 2), stored_hash)
+    bounded = run(PasswordVerifier(), stored_hash)
+
+    print(f"{ATTACKERS} concurrent login attempts for {DURATION:.0f}s")
+    print(f"{'':<24}{'verif/s':>10}{'refused':>10}{'api p50 ms':>12}{'api p99 ms':>12}")
+    print(f"{'idle':<24}{'':>10}{'':>10}{baseline[100] * 1000:>12.2f}{baseline[198] * 1000:>12.2f}")
+    for name, result in (("unbounded verifier", unbounded), ("bounded pool", bounded)):
+        print(f"{name:<24}{result['verifications_per_sec']:>10.1f}{result['refused']:>10}"
+              f"{result['api_p50_ms']:>12.2f}{result['api_p99_ms']:>12.2f}")
+
+    limiter = TokenBucketLimiter()
+    allowed = sum(limiter.allow("user:admin") for _ in range(100))
+    print(f"token bucket: {allowed} of 100 back-to-back attempts on one username allowed "
+          f"(burst {limiter.burst}, refill {limiter.rate}/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# This script measures the background MQTT client against the in-process stub broker:
+# how long publish_async() blocks the caller, end-to-end throughput, queue latency,
+# and QoS 1 round trips through the synchronous publish() path.
+# Run from the project root: python -m benchmarks.bench_mqtt
+import os
+import time
+from app.mqtt_service import MQTTService
+from benchmarks.stub_broker import StubBroker
+
+MESSAGES = int(os.environ.get("BENCH_MESSAGES", 5000))
+QOS1_MESSAGES = int(os.environ.get("BENCH_QOS1_MESSAGES", 500))
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Benchmark timed out")
+        time.sleep(0.01)
+
+def main():
+    broker = StubBroker().start()
+    service = MQTTService(broker="127.0.0.1", port=broker.port, queue_size=MESSAGES)
+    service.start()
+    wait_for(service.is_connected)
+
+    start = time.perf_counter()
+    for i in range(MESSAGES):
+        service.publish_async("smartnest/bench", f"reading {i}")
+    enqueue_s = time.perf_counter() - start
+    wait_for(lambda: broker.received >= MESSAGES)
+    total_s = time.perf_counter() - start
+    stats = service.stats()
+
+    start = time.perf_counter()
+    for i in range(QOS1_MESSAGES):
+        service.publish("smartnest/bench", f"ack {i}", qos=1).wait_for_publish(5)
+    qos1_s = time.perf_counter() - start
+
+    service.stop()
+    broker.stop()
+
+    print(f"{MESSAGES} QoS 0 messages via publish_async")
+    print(f"{'caller time per publish':<28}{enqueue_s / MESSAGES * 1e6:>10.1f} us")
+    print(f"{'delivered to broker':<28}{MESSAGES / total_s:>10.0f} msg/s")
+    print(f"{'queue latency avg':<28}{stats['avg_latency_ms']:>10.2f} ms")
+    print(f"{'queue latency max':<28}{stats['max_latency_ms']:>10.2f} ms")
+    print(f"{QOS1_MESSAGES} QoS 1 messages via publish + wait_for_publish")
+    print(f"{'round trip avg':<28}{qos1_s / QOS1_MESSAGES * 1000:>10.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# This script measures cold start: importing the app package and running create_app().
+# Each run is a fresh interpreter against a throwaway database and a missing data directory,
+# and fails if the median start time exceeds the budget or if a hardware library was imported.
+# Run from the project root: python -m benchmarks.bench_startup
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RUNS = int(os.environ.get("BENCH_RUNS", 5))
+BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 1500))  # Median create_app() cold start allowed
+HARDWARE_MODULES = ("gpiozero", "RPi", "adafruit_dht", "board")
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported_ms = (time.perf_counter() - start) * 1000
+create_app()
+total_ms = (time.perf_counter() - start) * 1000
+hardware = [name for name in %r if name in sys.modules]
+print(json.dumps({"import_ms": imported_ms, "total_ms": total_ms, "hardware": hardware}))
+""" % (HARDWARE_MODULES,)
+
+def run_once(workdir, backend):
+    env = dict(os.environ,
+               DB_FILE=os.path.join(workdir, "startup.db"),
+               DATA_DIR=os.path.join(workdir, "missing-data"),
+               HARDWARE=backend)
+    output = subprocess.run([sys.executable, "-c", CHILD], env=env, cwd=os.getcwd(),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    failed = False
+    with tempfile.TemporaryDirectory() as workdir:
+        # "real" is selected but never used: create_app() must not load the drivers
+        for backend in ("mock", "real"):
+            results = [run_once(workdir, backend) for _ in range(RUNS)]
+            import_ms = statistics.median(r["import_ms"] for r in results)
+            total_ms = statistics.median(r["total_ms"] for r in results)
+            hardware = sorted({name for r in results for name in r["hardware"]})
+            print(f"HARDWARE={backend}: import {import_ms:.1f} ms, create_app {total_ms:.1f} ms "
+                  f"(median of {RUNS}), hardware modules imported: {hardware or 'none'}")
+            if total_ms > BUDGET_MS:
+                print(f"  over budget: {total_ms:.1f} ms > {BUDGET_MS:.0f} ms")
+                failed = True
+            if hardware:
+                print("  hardware libraries were imported at startup")
+                failed = True
+    print("FAIL" if failed else "OK")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
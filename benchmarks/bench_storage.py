@@ -0,0 +1,75 @@
+# This script compares the old connect-per-call SQLite access with the pooled storage layer.
+# It reports inserts/sec and reads/sec for both, using a throwaway database file.
+# Run from the project root: python -m benchmarks.bench_storage
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from app import storage
+
+ITERATIONS = int(os.environ.get("BENCH_ITERATIONS", 2000))
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS sensor_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        temperature REAL NOT NULL,
+        humidity REAL NOT NULL
+    )
+'''
+INSERT = "INSERT INTO sensor_data (timestamp, temperature, humidity) VALUES (?, ?, ?)"
+SELECT = "SELECT * FROM sensor_data WHERE id = ?"
+
+def insert_per_call(db_file):
+    """Baseline: open, insert, commit and close for every reading."""
+    conn = sqlite3.connect(db_file)
+    conn.execute(INSERT, (datetime.now().isoformat(), 21.5, 40.0))
+    conn.commit()
+    conn.close()
+
+def read_per_call(db_file, row_id):
+    """Baseline: open, select and close for every lookup."""
+    conn = sqlite3.connect(db_file)
+    row = conn.execute(SELECT, (row_id,)).fetchone()
+    conn.close()
+    return row
+
+def insert_pooled(db_file):
+    storage.execute(INSERT, (datetime.now().isoformat(), 21.5, 40.0), db_file=db_file)
+
+def read_pooled(db_file, row_id):
+    return storage.query_one(SELECT, (row_id,), db_file=db_file)
+
+def measure(insert, read, db_file):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        insert(db_file)
+    inserts_per_sec = ITERATIONS / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        read(db_file, i + 1)
+    reads_per_sec = ITERATIONS / (time.perf_counter() - start)
+    return inserts_per_sec, reads_per_sec
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        before_db = os.path.join(tmp, "before.db")
+        after_db = os.path.join(tmp, "after.db")
+        for db_file in (before_db, after_db):
+            conn = sqlite3.connect(db_file)
+            conn.execute(SCHEMA)
+            conn.close()
+
+        before = measure(insert_per_call, read_per_call, before_db)
+        after = measure(insert_pooled, read_pooled, after_db)
+        storage.close_all()
+
+    print(f"{'':<18}{'inserts/sec':>14}{'reads/sec':>14}")
+    print(f"{'connect per call':<18}{before[0]:>14.0f}{before[1]:>14.0f}")
+    print(f"{'pooled + WAL':<18}{after[0]:>14.0f}{after[1]:>14.0f}")
+    print(f"{'speedup':<18}{after[0] / before[0]:>13.1f}x{after[1] / before[1]:>13.1f}x")
+
+if __name__ == "__main__":
+    main()
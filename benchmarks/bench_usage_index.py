@@ -0,0 +1,93 @@
+# This script measures daily usage aggregation over a synthetic DATA_DIR.
+# It compares re-parsing every YYYY-MM-DD.json file (the old calculate_stats/plots loop)
+# with the cached usage index, cold and warm, and after touching a single file,
+# then repeats the cold build after converting the files to the columnar format.
+# Run from the project root: python -m benchmarks.bench_usage_index
+import os
+import json
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from app import storage, usage_index, usage_store
+
+DAYS = int(os.environ.get("BENCH_DAYS", 1500))
+READINGS_PER_DAY = 24
+
+def make_data_dir(path, days):
+    """Write `days` pretty-printed daily usage files like the ones in data/."""
+    start = date.today() - timedelta(days=days - 1)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        records = [
+            {"timestamp": f"{day} {hour:02d}:00:00", "usage": random.randint(5, 30)}
+            for hour in range(READINGS_PER_DAY)
+        ]
+        with open(os.path.join(path, f"{day}.json"), "w") as f:
+            json.dump(records, f, indent=4)
+    return start + timedelta(days=days - 1)
+
+def parse_all(data_dir):
+    """Baseline: list the directory and json.load every file."""
+    totals = {}
+    for filename in os.listdir(data_dir):
+        if filename.endswith(".json"):
+            with open(os.path.join(data_dir, filename), "r") as f:
+                totals[filename.split(".")[0]] = sum(item.get("usage", 0) for item in json.load(f))
+    return totals
+
+def dir_size(path, suffix):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.name.endswith(suffix))
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        os.makedirs(data_dir)
+        last_day = make_data_dir(data_dir, DAYS)
+        storage.DB_FILE = os.path.join(tmp, "bench.db")
+
+        baseline_ms, expected = timed(parse_all, data_dir)
+        cold_ms, result = timed(usage_index.daily_usage, data_dir)
+        warm_ms, _ = timed(usage_index.daily_usage, data_dir)
+
+        # Simulate today's file growing by one reading
+        today_file = os.path.join(data_dir, f"{last_day}.json")
+        with open(today_file, "r") as f:
+            records = json.load(f)
+        records.append({"timestamp": f"{last_day} 23:59:00", "usage": 1})
+        with open(today_file, "w") as f:
+            json.dump(records, f, indent=4)
+        touched_ms, _ = timed(usage_index.daily_usage, data_dir)
+
+        usage_index.clear_cache()
+        restart_ms, _ = timed(usage_index.daily_usage, data_dir)
+
+        # Columnar format: convert, then build a fresh index from the .usage files only
+        json_bytes = dir_size(data_dir, ".json")
+        convert_ms, _ = timed(usage_store.convert_data_dir, data_dir, True)
+        columnar_bytes = dir_size(data_dir, usage_store.SUFFIX)
+        storage.close_all()
+        storage.DB_FILE = os.path.join(tmp, "bench-columnar.db")
+        usage_index.clear_cache()
+        columnar_ms, _ = timed(usage_index.daily_usage, data_dir)
+        storage.close_all()
+
+    assert result == expected, "Index totals differ from a full re-parse"
+    print(f"{DAYS} day files")
+    print(f"{'re-parse every file':<32}{baseline_ms:>10.1f} ms")
+    print(f"{'index, cold (first build)':<32}{cold_ms:>10.1f} ms")
+    print(f"{'index, warm':<32}{warm_ms:>10.1f} ms")
+    print(f"{'index, one file changed':<32}{touched_ms:>10.1f} ms")
+    print(f"{'index, after process restart':<32}{restart_ms:>10.1f} ms")
+    print(f"{'convert JSON to columnar':<32}{convert_ms:>10.1f} ms")
+    print(f"{'index, cold, columnar files':<32}{columnar_ms:>10.1f} ms")
+    print(f"{'bytes on disk, JSON':<32}{json_bytes:>10}")
+    print(f"{'bytes on disk, columnar':<32}{columnar_bytes:>10}")
+
+if __name__ == "__main__":
+    main()
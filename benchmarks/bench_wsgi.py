@@ -0,0 +1,136 @@
+# This script compares request throughput of the Flask development server with gunicorn
+# (when installed) serving wsgi-style workers. Each server runs in its own process on the mock
+# hardware against a throwaway database, and CLIENTS threads send requests over fresh
+# connections for DURATION seconds per route, reporting requests/second and p50/p95 latency.
+# Run from the project root: python -m benchmarks.bench_wsgi
+import contextlib
+import http.client
+import io
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+CLIENTS = int(os.environ.get("BENCH_CLIENTS", 16))  # Concurrent client threads
+DURATION = float(os.environ.get("BENCH_DURATION", 5.0))  # Seconds per route and server
+READINGS = int(os.environ.get("BENCH_READINGS", 20000))
+ROUTES = ("/api/sensor", "/api/sensor-data?limit=100", "/stats")
+
+# (name, gunicorn arguments); None is the development server
+SERVERS = [
+    ("flask dev server (threaded)", None),
+    ("gunicorn 1 worker x 8 threads", ["--workers", "1", "--threads", "8"]),
+    ("gunicorn 2 workers x 8 threads", ["--workers", "2", "--threads", "8"]),
+    ("gunicorn 4 sync workers", ["--workers", "4"]),
+]
+
+def create_bench_app():
+    """The wsgi.py app with login disabled, so the benchmark needs no session."""
+    from wsgi import app
+    app.config["LOGIN_DISABLED"] = True
+    return app
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until_up(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", ROUTES[0])
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+def measure(port, route):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + DURATION
+
+    def client():
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            connection.request("GET", route)
+            response = connection.getresponse()
+            response.read()
+            connection.close()
+            if response.status == 200:
+                local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    if not latencies:
+        return 0.0, 0.0, 0.0
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return len(latencies) / elapsed, statistics.median(latencies) * 1000, p95 * 1000
+
+def start_server(gunicorn_args, port, env):
+    if gunicorn_args is None:
+        command = [sys.executable, "-m", "benchmarks.bench_wsgi", "--serve", str(port)]
+    else:
+        command = [shutil.which("gunicorn"), *gunicorn_args, "--bind", f"127.0.0.1:{port}",
+                   "benchmarks.bench_wsgi:create_bench_app()"]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, DB_FILE=os.path.join(workdir, "wsgi.db"), DATA_DIR=os.path.join(workdir, "data"),
+                   HARDWARE="mock", PYTHONPATH=os.getcwd(), SENSOR_SAMPLE_INTERVAL="1")
+        os.environ.update(DB_FILE=env["DB_FILE"], HARDWARE="mock")
+
+        # Seed the database once; every server reads the same rows
+        from app import create_app
+        from app.models import save_sensor_data_batch
+        create_app()
+        now = int(time.time())
+        with contextlib.redirect_stdout(io.StringIO()):
+            save_sensor_data_batch([(now - READINGS * 60 + i * 60, 21.0 + i % 7 * 0.1, 48.0) for i in range(READINGS)])
+
+        print(f"{CLIENTS} clients, {DURATION:.0f}s per route, {os.cpu_count()} CPUs")
+        print(f"{'server':<34}{'route':<30}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}")
+        for name, gunicorn_args in SERVERS:
+            if gunicorn_args is not None and shutil.which("gunicorn") is None:
+                print(f"{name:<34}skipped: gunicorn is not installed")
+                continue
+            port = free_port()
+            server = start_server(gunicorn_args, port, env)
+            try:
+                wait_until_up(port)
+                time.sleep(1.0)  # Let the sampler take a first reading
+                for route in ROUTES:
+                    rate, p50, p95 = measure(port, route)
+                    print(f"{name:<34}{route:<30}{rate:>8.0f}{p50:>9.1f}{p95:>9.1f}")
+            finally:
+                server.terminate()  # SIGTERM: graceful shutdown, buffers flushed
+                server.wait(30)
+
+def serve(port):
+    """Run the development server the way run.py does, with login disabled."""
+    app = create_bench_app()
+    app.run(host="127.0.0.1", port=port, threaded=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]))
+    else:
+        main()
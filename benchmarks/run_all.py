@@ -0,0 +1,331 @@
+# This script is the reproducible benchmark suite. It runs entirely on the mock hardware backend
+# against throwaway databases and synthetic data directories, and measures ingestion, history
+# queries, stats/plots rendering for several DATA_DIR sizes, the offline journal and replay,
+# and the login path. Results are written as JSON so runs can be compared across commits.
+# Run from the project root:
+#   python -m benchmarks.run_all --output before.json
+#   python -m benchmarks.run_all --output after.json --compare before.json
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCALES = {
+    "quick": {"rows": 300, "batch_rows": 5000, "history_rows": 20000, "requests": 30,
+              "days": [30, 365], "journal_entries": 2000, "logins": 3},
+    "full": {"rows": 2000, "batch_rows": 50000, "history_rows": 200000, "requests": 200,
+             "days": [30, 365, 1095], "journal_entries": 20000, "logins": 10},
+}
+REGRESSION_THRESHOLD = float(os.environ.get("BENCH_REGRESSION_THRESHOLD", 0.15))  # Relative change flagged by --compare
+
+def metric(value, unit, better):
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+def throughput(count, seconds, unit):
+    return metric(count / seconds, unit, "higher")
+
+def latencies(samples):
+    """p50/p95 of a list of seconds, in milliseconds."""
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return metric(statistics.median(samples) * 1000, "ms", "lower"), metric(p95 * 1000, "ms", "lower")
+
+def time_requests(client, count, *args, **kwargs):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get(*args, **kwargs)
+        response.get_data()
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, (args, response.status_code)
+    return latencies(samples)
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the app's per-row print() logging while timing."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def fresh_database(workdir, name):
+    from app import storage
+    from app.models import setup_database
+
+    storage.close_all()
+    storage.DB_FILE = os.path.join(workdir, f"{name}.db")
+    for suffix in ("", "-wal", "-shm"):  # Repeated runs start from an empty database too
+        if os.path.exists(storage.DB_FILE + suffix):
+            os.remove(storage.DB_FILE + suffix)
+    setup_database()
+
+def make_data_dir(path, days):
+    os.makedirs(path, exist_ok=True)
+    start = 1700000000  # Fixed, so every run builds identical files
+    for day in range(days):
+        date = time.strftime("%Y-%m-%d", time.gmtime(start + day * 86400))
+        with open(os.path.join(path, f"{date}.json"), "w") as f:
+            json.dump([{"timestamp": f"{date}T{hour:02d}:00:00", "usage": round(0.2 + hour % 5 * 0.1, 2)}
+                       for hour in range(24)], f)
+
+def synthetic_readings(count, start=1700000000):
+    rng = random.Random(0)
+    return [(start + i * 60, round(20 + rng.uniform(-2, 2), 1), round(50 + rng.uniform(-5, 5), 1))
+            for i in range(count)]
+
+# Cases
+
+def bench_ingest(workdir, scale, app):
+    from app.models import save_sensor_data, save_sensor_data_batch
+
+    fresh_database(workdir, "ingest")
+    with quiet():
+        start = time.perf_counter()
+        for temperature, humidity in ((21.0, 50.0),) * scale["rows"]:
+            save_sensor_data(temperature, humidity)
+        per_row = time.perf_counter() - start
+
+        readings = synthetic_readings(scale["batch_rows"])
+        start = time.perf_counter()
+        for i in range(0, len(readings), 50):
+            save_sensor_data_batch(readings[i:i + 50])
+        batched = time.perf_counter() - start
+    return {
+        "save_sensor_data": throughput(scale["rows"], per_row, "rows/s"),
+        "save_sensor_data_batch_50": throughput(len(readings), batched, "rows/s"),
+    }
+
+def bench_history(workdir, scale, app):
+    from app.models import save_sensor_data_batch
+
+    fresh_database(workdir, "history")
+    readings = synthetic_readings(scale["history_rows"])
+    with quiet():
+        for i in range(0, len(readings), 5000):
+            save_sensor_data_batch(readings[i:i + 5000])
+    client = app.test_client()
+    middle = readings[len(readings) // 2][0]
+    count = scale["requests"]
+
+    results = {}
+    results["page_1000_p50"], results["page_1000_p95"] = time_requests(client, count, "/api/sensor-data?limit=1000")
+    results["range_page_p50"], results["range_page_p95"] = time_requests(
+        client, count, f"/api/sensor-data?from={middle}&to={middle + 86400}&limit=1000")
+    results["bucket_1h_p50"], results["bucket_1h_p95"] = time_requests(client, count, "/api/sensor-data?bucket=1h&limit=1000")
+
+    # Walk every page with the cursor
+    start = time.perf_counter()
+    cursor = ""
+    while cursor is not None:
+        body = client.get(f"/api/sensor-data?limit=5000&cursor={cursor}").get_json()
+        cursor = body["next_cursor"]
+    results["full_scan"] = throughput(len(readings), time.perf_counter() - start, "rows/s")
+    return results
+
+def bench_pages(workdir, scale, app):
+    from app import utils, usage_index
+
+    client = app.test_client()
+    results = {}
+    for days in scale["days"]:
+        fresh_database(workdir, f"pages-{days}")
+        data_dir = os.path.join(workdir, f"data-{days}")
+        make_data_dir(data_dir, days)
+        utils.DATA_DIR = usage_index.DATA_DIR = data_dir
+        usage_index.clear_cache()
+
+        start = time.perf_counter()
+        assert client.get("/stats").status_code == 200
+        results[f"stats_{days}d_cold"] = metric((time.perf_counter() - start) * 1000, "ms", "lower")
+        results[f"stats_{days}d_p50"], _ = time_requests(client, scale["requests"], "/stats")
+        results[f"plots_{days}d_p50"], _ = time_requests(client, scale["requests"], "/plots")
+        results[f"plot_data_{days}d_p50"], _ = time_requests(client, scale["requests"], "/api/plot-data?series=usage")
+    return results
+
+def bench_offline(workdir, scale, app):
+    from app.offline_journal import OfflineJournal
+    from app.offline_replay import OfflineReplayer
+    from app.mqtt_service import MQTTService
+    from benchmarks.stub_broker import StubBroker
+
+    journal = OfflineJournal(directory=tempfile.mkdtemp(prefix="offline-", dir=workdir))
+    entries = [{"timestamp": t, "temperature": temperature, "humidity": humidity}
+               for t, temperature, humidity in synthetic_readings(scale["journal_entries"])]
+    start = time.perf_counter()
+    for entry in entries:
+        journal.append(entry)
+    appended = time.perf_counter() - start
+
+    broker = StubBroker().start()
+    service = MQTTService(broker="127.0.0.1", port=broker.port, client_id="bench-offline")
+    service.start()
+    deadline = time.monotonic() + 10
+    while not service.is_connected() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    replayer = OfflineReplayer(journal=journal, rate=0, max_inflight=20)
+    with quiet():
+        start = time.perf_counter()
+        acked = replayer.run(service)
+        replayed = time.perf_counter() - start
+    service.stop()
+    broker.stop()
+    journal.close()
+    assert acked == len(entries), f"replayed {acked} of {len(entries)}"
+    return {
+        "journal_append": throughput(len(entries), appended, "entries/s"),
+        "replay_qos1": throughput(acked, replayed, "readings/s"),
+    }
+
+def bench_login(workdir, scale, app):
+    from app.models import add_user
+    from app.auth_throttle import login_limiter
+
+    fresh_database(workdir, "login")
+    add_user("bench", "bench-password")
+    login_limiter.burst = 1000000  # Measure the login path, not the rate limiter
+    client = app.test_client()
+
+    samples = []
+    for _ in range(scale["logins"]):
+        start = time.perf_counter()
+        response = client.post("/login", data={"username": "bench", "password": "bench-password"})
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 302, response.status_code
+    results = {}
+    results["login_p50"], results["login_p95"] = latencies(samples)
+
+    # Authenticated requests go through the cached user_loader
+    app.config["LOGIN_DISABLED"] = False
+    try:
+        results["authenticated_request_p50"], _ = time_requests(client, scale["requests"], "/dashboard")
+    finally:
+        app.config["LOGIN_DISABLED"] = True
+    return results
+
+CASES = {
+    "ingest": bench_ingest,
+    "history": bench_history,
+    "pages": bench_pages,
+    "offline": bench_offline,
+    "login": bench_login,
+}
+
+# Reporting
+
+def calibrate():
+    """Milliseconds for a fixed pure-Python workload, to tell a slower machine from slower code."""
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        sum(i * i for i in range(200000))
+        samples.append(time.perf_counter() - start)
+    return round(min(samples) * 1000, 3)
+
+def environment():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "calibration_ms": calibrate(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD, normalize=False):
+    """
+    Print each metric next to the baseline. Returns the names of metrics
+    that regressed. With `normalize`, baseline values are first scaled by
+    the ratio of the two machines' calibration times.
+    """
+    regressions = []
+    speed = current["environment"]["calibration_ms"] / baseline["environment"]["calibration_ms"]
+    print(f"\nCompared with {baseline['environment'].get('commit') or 'baseline'} "
+          f"(this machine is {speed:.2f}x the baseline's calibration time{', normalized' if normalize else ''}):")
+    for case, metrics in current["results"].items():
+        for name, result in metrics.items():
+            old = baseline["results"].get(case, {}).get(name)
+            if old is None or not old["value"]:
+                continue
+            expected = old["value"]
+            if normalize:
+                expected = expected * speed if result["better"] == "lower" else expected / speed
+            change = (result["value"] - expected) / expected
+            worse = -change if result["better"] == "higher" else change
+            flag = "REGRESSION" if worse > threshold else ""
+            if flag:
+                regressions.append(f"{case}.{name}")
+            print(f"  {case + '.' + name:<40}{expected:>12.2f} -> {result['value']:>12.2f} {result['unit']:<12}"
+                  f"{change:>+8.1%} {flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SmartNest benchmark suite on mock hardware.")
+    parser.add_argument("--scale", choices=SCALES, default="full")
+    parser.add_argument("--repeat", type=int, default=3, help="Run each case this many times and report medians")
+    parser.add_argument("--only", action="append", choices=CASES, help="Run only this case (repeatable)")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON file; exits 1 if a metric regressed beyond the threshold")
+    parser.add_argument("--normalize", action="store_true",
+                        help="Scale the baseline by the machines' calibration ratio before comparing")
+    args = parser.parse_args()
+    scale = SCALES[args.scale]
+
+    with tempfile.TemporaryDirectory(prefix="smartnest-bench-") as workdir:
+        # Must be set before the app modules are imported
+        os.environ.update(
+            HARDWARE="mock",
+            DB_FILE=os.path.join(workdir, "bench.db"),
+            DATA_DIR=os.path.join(workdir, "data"),
+            OFFLINE_DIR=os.path.join(workdir, "offline-default"),
+            HTTP_CACHE="0",  # Measure the work behind each route, not cache hits
+            HTTP_COMPRESS="0",
+        )
+        random.seed(0)
+        from app import create_app
+
+        with quiet():
+            app = create_app()
+        app.config["LOGIN_DISABLED"] = True
+
+        report = {"suite": "smartnest", "format": 1, "scale": args.scale, "repeat": args.repeat,
+                  "environment": environment(), "results": {}}
+        for name in args.only or CASES:
+            print(f"Running {name}...", file=sys.stderr)
+            started = time.perf_counter()
+            runs = [CASES[name](workdir, scale, app) for _ in range(args.repeat)]
+            report["results"][name] = {
+                key: dict(result, value=round(statistics.median(run[key]["value"] for run in runs), 4))
+                for key, result in runs[0].items()
+            }
+            print(f"  done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    for case, metrics in report["results"].items():
+        for name, result in metrics.items():
+            print(f"{case + '.' + name:<40}{result['value']:>14.2f} {result['unit']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), normalize=args.normalize)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {REGRESSION_THRESHOLD:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
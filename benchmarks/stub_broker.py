@@ -0,0 +1,145 @@
+# A minimal in-process MQTT 3.1.1 broker for benchmarks and local testing without mosquitto.
+# It supports CONNECT, PUBLISH (QoS 0/1), SUBSCRIBE with + and # wildcards, PINGREQ and DISCONNECT.
+# Run standalone on port 1883: python -m benchmarks.stub_broker
+import socket
+import socketserver
+import struct
+import threading
+
+def _read_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Client closed the connection")
+        data += chunk
+    return data
+
+def _read_packet(sock):
+    """Return (packet type, flags, body) for the next packet on `sock`."""
+    header = _read_exact(sock, 1)[0]
+    length, multiplier = 0, 1
+    while True:
+        byte = _read_exact(sock, 1)[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+    return header >> 4, header & 0x0F, _read_exact(sock, length)
+
+def _packet(packet_type, body, flags=0):
+    length, encoded = len(body), b""
+    while True:
+        byte, length = length % 128, length // 128
+        encoded += bytes([byte | (0x80 if length else 0)])
+        if not length:
+            break
+    return bytes([(packet_type << 4) | flags]) + encoded + body
+
+def topic_matches(pattern, topic):
+    pattern_parts, topic_parts = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+class StubBroker(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.subscriptions = {}  # handler -> list of topic filters
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.received = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-broker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop accepting connections and drop every connected client."""
+        self.shutdown()
+        self.server_close()
+        with self.lock:
+            connections = list(self.connections)
+        for handler in connections:
+            try:
+                handler.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def route(self, topic, payload):
+        with self.lock:
+            self.received += 1
+            targets = [handler for handler, filters in self.subscriptions.items()
+                       if any(topic_matches(f, topic) for f in filters)]
+        encoded_topic = topic.encode()
+        message = _packet(3, struct.pack("!H", len(encoded_topic)) + encoded_topic + payload)
+        for handler in targets:
+            handler.send(message)
+
+class _Handler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.send_lock = threading.Lock()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections.add(self)
+
+    def send(self, data):
+        try:
+            with self.send_lock:
+                self.request.sendall(data)
+        except OSError:
+            pass
+
+    def handle(self):
+        broker = self.server
+        try:
+            while True:
+                packet_type, flags, body = _read_packet(self.request)
+                if packet_type == 1:  # CONNECT
+                    self.send(_packet(2, b"\x00\x00"))
+                elif packet_type == 3:  # PUBLISH
+                    qos = (flags >> 1) & 0x03
+                    topic_length = struct.unpack("!H", body[:2])[0]
+                    topic = body[2:2 + topic_length].decode()
+                    position = 2 + topic_length
+                    if qos:
+                        packet_id = body[position:position + 2]
+                        position += 2
+                        self.send(_packet(4, packet_id))
+                    broker.route(topic, body[position:])
+                elif packet_type == 8:  # SUBSCRIBE
+                    packet_id, position, filters = body[:2], 2, []
+                    while position < len(body):
+                        length = struct.unpack("!H", body[position:position + 2])[0]
+                        filters.append(body[position + 2:position + 2 + length].decode())
+                        position += 3 + length
+                    with broker.lock:
+                        broker.subscriptions.setdefault(self, []).extend(filters)
+                    self.send(_packet(9, packet_id + b"\x00" * len(filters)))
+                elif packet_type == 12:  # PINGREQ
+                    self.send(_packet(13, b""))
+                elif packet_type == 14:  # DISCONNECT
+                    return
+        except (ConnectionError, OSError):
+            return
+        finally:
+            with broker.lock:
+                broker.subscriptions.pop(self, None)
+                broker.connections.discard(self)
+
+if __name__ == "__main__":
+    broker = StubBroker(host="0.0.0.0", port=1883)
+    print(f"Stub MQTT broker listening on port {broker.port}")
+    broker.serve_forever()
@@ -5,6 +5,7 @@
 import os
 import logging
 from app import create_app
+from app.services import background_services
 
 # Create the Flask app
 app = create_app()
@@ -47,5 +48,10 @@ if __name__ == "__main__":
         print(str(e))  # Output error to console for visibility
         exit(1)  # Exit if MQTT server is not reachable
 
-    # Run the Flask app
-    app.run(host="0.0.0.0", port=5000, debug=os.environ.get("FLASK_ENV") == "development")
+    # Background services run in the serving process, not the debug reloader's parent
+    debug = os.environ.get("FLASK_ENV") == "development"
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN"):
+        background_services.start()
+
+    # Run the Flask development server; use wsgi.py with gunicorn or waitress in production
+    app.run(host="0.0.0.0", port=5000, debug=debug)
@@ -1,16 +1,12 @@
 # This script is used to view the existing users in the database and add a default user if none exist.
-import sqlite3
 from werkzeug.security import generate_password_hash
+from app.storage import get_connection, transaction
 
 DB_FILE = "smartnest.db"
 
 def view_users():
     """Function to view existing users in the database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username, password FROM users")
-    rows = cursor.fetchall()
-    conn.close()
+    rows = get_connection(DB_FILE).execute("SELECT id, username, password FROM users").fetchall()
 
     if rows:
         print("Existing users in the database:")
@@ -21,23 +17,17 @@ def view_users():
 
 def add_default_user(username, password):
     """Function to add a default user to the database."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    # Check if the username already exists
-    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-    existing_user = cursor.fetchone()
-
-    if existing_user:
-        print(f"User '{username}' already exists in the database. Skipping addition.")
-    else:
-        # Add the user if they don't exist
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
-        cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password))
-        conn.commit()
-        print(f"Default user '{username}' added successfully.")
-
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        # Check if the username already exists
+        existing_user = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+
+        if existing_user:
+            print(f"User '{username}' already exists in the database. Skipping addition.")
+        else:
+            # Add the user if they don't exist
+            hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password))
+            print(f"Default user '{username}' added successfully.")
     
 if __name__ == "__main__":
     print("Viewing existing users:")
@@ -50,12 +40,9 @@ if __name__ == "__main__":
     view_users()
     
 def update_admin_password(new_password):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
     hashed_password = generate_password_hash(new_password, method='pbkdf2:sha256')
-    cursor.execute("UPDATE users SET password = ? WHERE username = 'admin'", (hashed_password,))
-    conn.commit()
-    conn.close()
+    with transaction(DB_FILE) as conn:
+        conn.execute("UPDATE users SET password = ? WHERE username = 'admin'", (hashed_password,))
     print(f"Password for 'admin' updated successfully.")
 
 if __name__ == "__main__":
@@ -0,0 +1,11 @@
+# Production entry point for a multi-threaded or multi-process WSGI server, e.g.
+#   gunicorn --workers 2 --threads 8 --bind 0.0.0.0:5000 wsgi:app
+#   waitress-serve --threads 8 --port 5000 wsgi:app     (Windows)
+# Every worker imports this module. The sensor collector and MQTT client (plus the
+# automation rules if SERVICES includes "automation") run in exactly one worker per host
+# (see app/services.py); the others serve requests only. Do not use gunicorn's --preload: threads started before the fork are lost.
+from app import create_app
+from app.services import background_services
+
+app = create_app()
+background_services.start()  # Stopped, with buffers flushed, when the worker exits